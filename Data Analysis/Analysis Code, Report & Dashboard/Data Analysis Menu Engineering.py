@@ -65,17 +65,18 @@ pop_median = items_df["purchases"].median()
 # Profit threshold = median profit
 profit_median = items_df["profit"].median()
 
-def categorize(row):
-    if row["purchases"] >= pop_median and row["profit"] >= profit_median:
-        return "Star"
-    elif row["purchases"] >= pop_median and row["profit"] < profit_median:
-        return "Plowhorse"
-    elif row["purchases"] < pop_median and row["profit"] >= profit_median:
-        return "Puzzle"
-    else:
-        return "Dog"
-
-items_df["category"] = items_df.apply(categorize, axis=1)
+# Vectorized quadrant masks; both sides are compared explicitly so rows with
+# missing values still fall through to "Dog" as in the row-wise version
+popular = items_df["purchases"] >= pop_median
+unpopular = items_df["purchases"] < pop_median
+profitable = items_df["profit"] >= profit_median
+unprofitable = items_df["profit"] < profit_median
+
+items_df["category"] = np.select(
+    [popular & profitable, popular & unprofitable, unpopular & profitable],
+    ["Star", "Plowhorse", "Puzzle"],
+    default="Dog",
+)
 
 # === 6) Select only necessary columns for the model ===
 items_df_cleaned = items_df[[
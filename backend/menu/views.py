@@ -22,7 +22,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny, SAFE_METHODS
 from rest_framework.views import APIView
-from knox.auth import TokenAuthentication
+from users.authentication import TokenAuthentication
 from django.utils import timezone
 from django.db.models import Sum, Count
 from drf_spectacular.utils import extend_schema
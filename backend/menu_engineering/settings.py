@@ -24,6 +24,9 @@ Configures the Menu Engineering backend, including:
 
 from pathlib import Path
 import os
+import sys
+
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -197,6 +200,12 @@ CELERY_RESULT_BACKEND = "redis://redis:6379/2"
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    "purge-revoked-tokens": {
+        "task": "users.tasks.purge_revoked_tokens_task",
+        "schedule": crontab(hour=3, minute=0),
+    },
+}
 
 # SMS (Twilio) Configuration
 TWILIO_ACCOUNT_SID = os.environ.get("TWILIO_ACCOUNT_SID", "")
@@ -208,9 +217,20 @@ AUTH_USER_MODEL = "users.CustomUser"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "knox.auth.TokenAuthentication",
+        "users.authentication.TokenAuthentication",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # Trusted reverse proxies in front of the app. Throttles key on the address
+    # the nearest proxy appends to X-Forwarded-For; 0 uses REMOTE_ADDR only
+    "NUM_PROXIES": int(os.environ.get("NUM_PROXIES", "0")),
+    # Scopes used by users.throttles on the login and password-reset views
+    "DEFAULT_THROTTLE_RATES": {
+        "auth_ip": "20/m",
+        "login_email": "10/m",
+        "login_sms": "3/5m",
+        "otp_session": "5/m",
+        "password_reset_email": "5/m",
+    },
 }
 
 SPECTACULAR_SETTINGS = {
@@ -237,7 +257,7 @@ SPECTACULAR_SETTINGS = {
     "VERSION": "1.0.0",
     "SERVE_INCLUDE_SCHEMA": False,
     "AUTHENTICATION_WHITELIST": [
-        "knox.auth.TokenAuthentication",
+        "users.authentication.TokenAuthentication",
     ],
     "SECURITY": [{"TokenAuthentication": []}],
     "ENUM_NAME_OVERRIDES": {
@@ -249,3 +269,39 @@ SPECTACULAR_SETTINGS = {
 
 # ML Service Configuration
 ML_SERVICE_URL = os.environ.get("ML_SERVICE_URL", "http://localhost:8001")
+
+# Test Configuration
+# `manage.py test` always runs against an in-memory SQLite database, even when
+# the PostgreSQL block above is enabled, so no migrations hit disk or network.
+TESTING = len(sys.argv) > 1 and sys.argv[1] == "test"
+
+if TESTING:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": ":memory:",
+        }
+    }
+    # A per-process cache keeps tests off the network and isolates parallel workers
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+    # Run Celery tasks inline and surface their exceptions in the calling test
+    CELERY_TASK_ALWAYS_EAGER = True
+    CELERY_TASK_EAGER_PROPAGATES = True
+    CELERY_TASK_STORE_EAGER_RESULT = False
+    # PBKDF2 is deliberately slow; tests only need a working hasher
+    PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+    class DisableMigrations:
+        """Build test tables straight from the models instead of replaying migrations"""
+
+        def __contains__(self, item):
+            return True
+
+        def __getitem__(self, item):
+            return None
+
+    MIGRATION_MODULES = DisableMigrations()
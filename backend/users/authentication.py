@@ -0,0 +1,90 @@
+"""
+File: authentication.py
+Author: Hamdy El-Madbouly
+Description: Knox token authentication with per-user bulk revocation.
+Rejects tokens created before the user's `tokens_valid_after` marker so that
+logging in on a new device invalidates older sessions without deleting
+every token row up front.
+`CachedTokenAuthentication` additionally remembers successful lookups in the
+cache for a short TTL; `revoke_cached_credentials` drops them for a user.
+"""
+
+import binascii
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+
+from knox.auth import TokenAuthentication as KnoxTokenAuthentication
+from knox.crypto import hash_token
+from drf_spectacular.contrib.knox_auth_token import KnoxTokenScheme
+
+_CREDENTIALS_KEY = "knox_auth:{}".format
+_GENERATION_KEY = "knox_auth_gen:{}".format
+CREDENTIALS_CACHE_TIMEOUT = 60
+
+
+class TokenAuthentication(KnoxTokenAuthentication):
+    def validate_user(self, auth_token):
+        valid_after = auth_token.user.tokens_valid_after
+        if valid_after is not None and auth_token.created < valid_after:
+            raise exceptions.AuthenticationFailed(_("Token has been revoked."))
+        return super().validate_user(auth_token)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Skips knox's token queries and digest comparison for recently seen tokens.
+
+    Entries are keyed by token digest and tagged with the user's credentials
+    generation; `revoke_cached_credentials` replaces the generation, so every
+    cached token of that user misses and is re-checked against the database.
+    """
+
+    def authenticate_credentials(self, token):
+        try:
+            key = _CREDENTIALS_KEY(hash_token(token.decode("utf-8")))
+        except (TypeError, binascii.Error, UnicodeDecodeError):
+            return super().authenticate_credentials(token)
+
+        cached = cache.get(key)
+        if cached is not None:
+            generation, user, auth_token = cached
+            if generation == cache.get(_GENERATION_KEY(user.pk)):
+                return user, auth_token
+
+        user, auth_token = super().authenticate_credentials(token)
+        timeout = CREDENTIALS_CACHE_TIMEOUT
+        if auth_token.expiry is not None:
+            remaining = (auth_token.expiry - timezone.now()).total_seconds()
+            timeout = min(timeout, int(remaining))
+        if timeout > 0:
+            generation = cache.get(_GENERATION_KEY(user.pk))
+            cache.set(key, (generation, user, auth_token), timeout)
+        return user, auth_token
+
+
+def revoke_cached_credentials(user_id):
+    """Invalidate every cached token lookup for the given user."""
+    # Outlives every entry tagged with the previous generation
+    cache.set(_GENERATION_KEY(user_id), uuid.uuid4().hex, CREDENTIALS_CACHE_TIMEOUT)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def _revoke_on_user_save(sender, instance, **kwargs):
+    """
+    Deactivation, role or password changes must not be hidden behind cached
+    users. Queryset update() skips this signal, so those callers revoke
+    explicitly.
+    """
+    revoke_cached_credentials(instance.pk)
+
+
+class TokenScheme(KnoxTokenScheme):
+    target_class = "users.authentication.TokenAuthentication"
+    match_subclasses = True
@@ -10,9 +10,16 @@ for email verification, password resets, and OTPs.
 import secrets
 from django.core.cache import cache
 from django.core.signing import TimestampSigner, BadSignature, SignatureExpired
+from django_redis import get_redis_connection
 
 from django.contrib.auth.base_user import BaseUserManager
 
+# Cache key builders shared by TokenManager and its tests
+_EMAIL_VERIFY_KEY = "email_verify:{}".format
+_PASSWORD_RESET_KEY = "password_reset:{}".format
+_OTP_KEY = "otp:{}".format
+_LOGIN_SESSION_KEY = "login_session:{}".format
+
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password, **extra_fields):
@@ -71,7 +78,7 @@ class TokenManager:
     @classmethod
     def set_email_verification_token(cls, user_id):
         token = cls._generate_signed_token()
-        key = f"email_verify:{token}"
+        key = _EMAIL_VERIFY_KEY(token)
         cache.set(key, user_id, timeout=86400)
         return token
 
@@ -80,7 +87,7 @@ class TokenManager:
         if not cls._validate_signed_token(token, max_age=86400):
             return None
 
-        key = f"email_verify:{token}"
+        key = _EMAIL_VERIFY_KEY(token)
         user_id = cache.get(key)
         if user_id:
             cache.delete(key)
@@ -90,7 +97,7 @@ class TokenManager:
     @classmethod
     def set_password_reset_token(cls, user_id):
         token = cls._generate_signed_token()
-        key = f"password_reset:{token}"
+        key = _PASSWORD_RESET_KEY(token)
         cache.set(key, user_id, timeout=900)
         return token
 
@@ -99,7 +106,7 @@ class TokenManager:
         if not cls._validate_signed_token(token, max_age=900):
             return None
 
-        key = f"password_reset:{token}"
+        key = _PASSWORD_RESET_KEY(token)
         user_id = cache.get(key)
         if user_id:
             cache.delete(key)
@@ -117,16 +124,48 @@ class TokenManager:
     def set_otp_token(cls, user_id, phone_number):
         """Generate complex OTP, store in Redis with 5-minute expiry"""
         otp = cls._generate_complex_otp()
-        key = f"otp:{phone_number}"
+        key = _OTP_KEY(phone_number)
         cache.set(key, {"otp": otp, "user_id": str(user_id)}, timeout=300)
         return otp
 
     @classmethod
     def validate_otp(cls, phone_number, otp):
         """Validate OTP and return user_id if valid"""
-        key = f"otp:{phone_number}"
+        key = _OTP_KEY(phone_number)
         data = cache.get(key)
         if data and data["otp"].upper() == otp.upper():
             cache.delete(key)
             return data["user_id"]
         return None
+
+    @staticmethod
+    def _redis_connection():
+        """Raw client behind the default cache, or None for non-Redis backends"""
+        try:
+            return get_redis_connection("default")
+        except NotImplementedError:
+            return None
+
+    @classmethod
+    def set_login_session(cls, session_token, user_id, timeout=300):
+        """Store a 2FA login session as a plain string with a single SETEX on Redis"""
+        key = _LOGIN_SESSION_KEY(session_token)
+        redis = cls._redis_connection()
+        if redis is None:
+            cache.set(key, str(user_id), timeout=timeout)
+            return
+        redis.setex(cache.make_key(key), timeout, str(user_id))
+
+    @classmethod
+    def pop_login_session(cls, session_token):
+        """Fetch and invalidate a 2FA login session in a single GETDEL on Redis"""
+        key = _LOGIN_SESSION_KEY(session_token)
+        redis = cls._redis_connection()
+        if redis is None:
+            value = cache.get(key)
+            cache.delete(key)
+            return value
+        value = redis.getdel(cache.make_key(key))
+        if value is None:
+            return None
+        return value.decode()
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-16 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_alter_customuser_type"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="tokens_valid_after",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Auth tokens created before this time are rejected.",
+                null=True,
+                verbose_name="Tokens Valid After",
+            ),
+        ),
+    ]
@@ -38,6 +38,12 @@ class CustomUser(AbstractUser):
         default=False,
         help_text=_("Designates whether this user has verified their email address."),
     )
+    tokens_valid_after = models.DateTimeField(
+        _("Tokens Valid After"),
+        null=True,
+        blank=True,
+        help_text=_("Auth tokens created before this time are rejected."),
+    )
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["first_name", "last_name", "phone_number"]
 
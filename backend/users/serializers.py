@@ -15,18 +15,20 @@ Login Flow (2FA):
 2. User enters OTP -> receives access token
 """
 
+import copy
+import secrets
 from datetime import timedelta
 
-from django.db import transaction
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth import authenticate
-from django.core.validators import RegexValidator
+from django.utils import timezone
 
 from rest_framework import serializers, exceptions
 from rest_framework.validators import UniqueValidator
 
 from knox.models import AuthToken
 
+from .authentication import revoke_cached_credentials
 from .models import CustomUser
 from .sms_service import send_otp_sms
 from .services import send_verification_email
@@ -34,12 +36,30 @@ from .managers import TokenManager
 from .tasks import send_otp_sms_task
 
 
+class CachedFieldsMixin:
+    """
+    Build a serializer's fields once per class and give each instance shallow
+    copies, skipping ModelSerializer's model introspection on every request.
+    """
+
+    _fields_cache = {}
+
+    def get_fields(self):
+        cls = type(self)
+        if cls not in CachedFieldsMixin._fields_cache:
+            CachedFieldsMixin._fields_cache[cls] = super().get_fields()
+        return {
+            name: copy.copy(field)
+            for name, field in CachedFieldsMixin._fields_cache[cls].items()
+        }
+
+
 # ============================================================================
 # User Creation (by Admin/Manager)
 # ============================================================================
 
 
-class CreateUserSerializer(serializers.ModelSerializer):
+class CreateUserSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """
     Admin/Manager creates a user without password.
     Password is set by user during email activation.
@@ -148,11 +168,10 @@ class ActivateAccountSerializer(serializers.Serializer):
         user = self.validated_data["token"]
         password = self.validated_data["password"]
 
-        with transaction.atomic():
-            user.set_password(password)
-            user.is_active = True
-            user.is_email_verified = True
-            user.save(update_fields=["password", "is_active", "is_email_verified"])
+        user.set_password(password)
+        user.is_active = True
+        user.is_email_verified = True
+        user.save(update_fields=["password", "is_active", "is_email_verified"])
 
         return {"status": "activated", "email": user.email}
 
@@ -169,13 +188,6 @@ class LoginStep1Serializer(serializers.Serializer):
     """
 
     email = serializers.EmailField(
-        validators=[
-            RegexValidator(
-                regex=r"^[^@\s]+@[^@\s]+\.[^@\s]+$",
-                message="Enter a valid email address.",
-                code="invalid",
-            )
-        ],
         help_text="User's registered email address (e.g., john.doe@example.com)",
     )
     password = serializers.CharField(
@@ -201,7 +213,8 @@ class LoginStep1Serializer(serializers.Serializer):
                 "Unable to log in with provided credentials.", code="authorization"
             )
 
-        # Check if account is activated (has password set)
+        # Check if account is activated (has password set) before authenticate()
+        # so unactivated accounts never pay for a password hash
         if not user.has_usable_password():
             raise serializers.ValidationError(
                 "Account not activated. Please check your email for activation link.",
@@ -231,25 +244,26 @@ class LoginStep1Serializer(serializers.Serializer):
     def create_session_and_send_otp(self):
         """Send OTP and return session token for step 2."""
         user = self.validated_data["user"]
+        phone_number = str(user.phone_number)
 
         # Generate OTP and store
-        otp = TokenManager.set_otp_token(user.id, str(user.phone_number))
+        otp = TokenManager.set_otp_token(user.id, phone_number)
 
         # Send OTP via SMS (async)
-        send_otp_sms_task.delay(str(user.phone_number), otp)
-
-        # Create a temporary session token for step 2
-        session_token = TokenManager._generate_signed_token()
-        from django.core.cache import cache
-
-        cache.set(
-            f"login_session:{session_token}",
-            str(user.id),
+        send_otp_sms_task.delay(phone_number, otp)
+
+        # Create a temporary session token for step 2 (only ever looked up
+        # by equality in the cache, so it does not need to be signed)
+        session_token = secrets.token_urlsafe(32)
+        TokenManager.set_login_session(
+            session_token,
+            user.id,
             timeout=300,  # 5 minutes to complete step 2
         )
 
+        last4 = f"{user.phone_number.national_number % 10000:04d}"
         return {
-            "message": f"OTP sent to phone ending in ...{str(user.phone_number)[-4:]}",
+            "message": f"OTP sent to phone ending in ...{last4}",
             "session_token": session_token,
         }
 
@@ -278,9 +292,8 @@ class LoginStep2Serializer(serializers.Serializer):
     refresh_ttl = timedelta(days=7)
 
     def validate_session_token(self, value):
-        from django.core.cache import cache
-
-        user_id = cache.get(f"login_session:{value}")
+        # Session is single-use: consumed here whether or not the OTP matches
+        user_id = TokenManager.pop_login_session(value)
         if not user_id:
             raise serializers.ValidationError(
                 "Session expired. Please start login again.", code="session_expired"
@@ -292,7 +305,6 @@ class LoginStep2Serializer(serializers.Serializer):
             raise serializers.ValidationError("User not found.")
 
         self._user = user
-        self._session_token = value
         return value
 
     def validate(self, attrs):
@@ -302,13 +314,7 @@ class LoginStep2Serializer(serializers.Serializer):
             raise serializers.ValidationError("Invalid session.")
 
         # Validate OTP
-        from django.core.cache import cache
-
-        # Ensure session is cleaned up regardless of OTP validity
-        try:
-            user_id = TokenManager.validate_otp(str(self._user.phone_number), otp)
-        finally:
-            cache.delete(f"login_session:{self._session_token}")
+        user_id = TokenManager.validate_otp(str(self._user.phone_number), otp)
 
         if not user_id:
             raise serializers.ValidationError(
@@ -321,8 +327,17 @@ class LoginStep2Serializer(serializers.Serializer):
         """Create and return access/refresh tokens."""
         user = self.validated_data["user"]
 
-        # Delete existing tokens
-        AuthToken.objects.filter(user=user).delete()
+        # Revoke existing tokens (single-device login). The marker rejects them
+        # even if they are in use right now; the rows go in one DELETE so knox
+        # doesn't walk dead tokens on every later request
+        user.tokens_valid_after = timezone.now()
+        CustomUser.objects.filter(pk=user.pk).update(
+            tokens_valid_after=user.tokens_valid_after
+        )
+        AuthToken.objects.filter(
+            user=user, created__lt=user.tokens_valid_after
+        ).delete()
+        revoke_cached_credentials(user.pk)
 
         # Choose token TTL based on email verification
         if user.is_email_verified:
@@ -364,23 +379,26 @@ class ResendActivationSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
     def validate_email(self, value):
-        try:
-            user = CustomUser.objects.get(email=value.lower())
-        except CustomUser.DoesNotExist:
-            raise serializers.ValidationError("User with this email does not exist.")
-
-        if user.is_email_verified:
-            raise serializers.ValidationError("Account is already activated.")
-
+        # Unknown or already activated emails are not validation errors so we
+        # don't reveal which accounts exist; save() silently skips them
+        user = (
+            CustomUser.objects.only("id", "email", "is_email_verified")
+            .filter(email=value.lower())
+            .first()
+        )
+        self._user = None if user is None or user.is_email_verified else user
         return value
 
     def save(self):
-        email = self.validated_data["email"]
-        user = CustomUser.objects.get(email=email.lower())
+        user = self._user
 
-        token = TokenManager.set_email_verification_token(user.id)
-        send_verification_email(user, token)
-        return {"detail": "Activation email sent."}
+        if user is not None:
+            token = TokenManager.set_email_verification_token(user.id)
+            send_verification_email(user, token)
+
+        return {
+            "detail": "If an unactivated account exists with this email, an activation link has been sent."
+        }
 
 
 # ============================================================================
@@ -396,7 +414,7 @@ class RefreshTokenSerializer(serializers.Serializer):
     refresh_ttl = timedelta(days=7)
 
     def validate_refresh(self, value):
-        from knox.auth import TokenAuthentication
+        from .authentication import TokenAuthentication
 
         try:
             user, token_instance = TokenAuthentication().authenticate_credentials(
@@ -415,6 +433,7 @@ class RefreshTokenSerializer(serializers.Serializer):
 
         old_refresh.delete()
         AuthToken.objects.filter(user=user).exclude(pk=old_refresh.pk).delete()
+        revoke_cached_credentials(user.pk)
 
         new_access_instance, new_access_token = AuthToken.objects.create(
             user=user, expiry=self.access_ttl
@@ -441,12 +460,16 @@ class ForgotPasswordRequestSerializer(serializers.Serializer):
 
     email = serializers.EmailField()
 
+    def validate_email(self, value):
+        # Cache the lookup for save(); a missing user is not a validation
+        # error so we don't reveal whether the email exists
+        self._user = CustomUser.objects.filter(email=value.lower()).first()
+        return value
+
     def save(self, **kwargs):
-        email = self.validated_data["email"]
+        user = self._user
 
-        try:
-            user = CustomUser.objects.get(email=email.lower())
-        except CustomUser.DoesNotExist:
+        if user is None:
             # Don't reveal if email exists, but return generic success
             return {
                 "detail": "If an account exists with this email, a password reset link has been sent."
@@ -503,8 +526,7 @@ class ForgotPasswordResetSerializer(serializers.Serializer):
         user = self.validated_data["user"]
         password = self.validated_data["password"]
 
-        with transaction.atomic():
-            user.set_password(password)
-            user.save(update_fields=["password"])
+        user.set_password(password)
+        user.save(update_fields=["password"])
 
         return {"status": "password_reset_success"}
@@ -14,11 +14,11 @@ from .tasks import (
 
 
 def send_verification_email(user, token):
-    send_verification_email_task.delay(user.id, token)
+    send_verification_email_task.delay(user.email, token)
 
 
 def send_forgot_password_email(user, token):
-    send_forgot_password_email_task.delay(user.id, token)
+    send_forgot_password_email_task.delay(user.email, token)
 
 
 def too_many_requests_email(user_email, msg):
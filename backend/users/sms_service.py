@@ -7,17 +7,28 @@ Includes a development fallback mode that logs OTPs to the console when
 API credentials are not configured.
 """
 
+from functools import lru_cache
+
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from twilio.rest import Client
 import logging
 
 logger = logging.getLogger(__name__)
 
 # Placeholder values that indicate Twilio is not configured
-PLACEHOLDER_VALUES = {"", "your_sid", "your_token", "your_phone", "changeme", "xxx"}
+PLACEHOLDER_VALUES = frozenset(
+    {"", "your_sid", "your_token", "your_phone", "changeme", "xxx"}
+)
 
 
+@lru_cache(maxsize=None)
 def _is_twilio_configured() -> bool:
-    """Check if Twilio is properly configured with real credentials."""
+    """
+    Check if Twilio is properly configured with real credentials.
+    Cached since settings don't change at runtime.
+    """
     sid = getattr(settings, "TWILIO_ACCOUNT_SID", "") or ""
     token = getattr(settings, "TWILIO_AUTH_TOKEN", "") or ""
     phone = getattr(settings, "TWILIO_PHONE_NUMBER", "") or ""
@@ -37,6 +48,13 @@ def _is_twilio_configured() -> bool:
     return True
 
 
+@receiver(setting_changed)
+def _reset_twilio_configured(setting, **kwargs):
+    """Invalidate the cached Twilio check when tests override its settings."""
+    if setting.startswith("TWILIO_"):
+        _is_twilio_configured.cache_clear()
+
+
 def send_otp_sms(phone_number: str, otp: str) -> bool:
     """
     Send OTP via SMS using Twilio.
@@ -45,14 +63,9 @@ def send_otp_sms(phone_number: str, otp: str) -> bool:
     if not _is_twilio_configured():
         # Development mode: log OTP to console
         logger.warning(f"[DEV MODE] SMS not configured. OTP for {phone_number}: {otp}")
-        print(f"\n{'='*50}")
-        print(f"[DEV MODE] OTP for {phone_number}: {otp}")
-        print(f"{'='*50}\n", flush=True)
         return True
 
     try:
-        from twilio.rest import Client
-
         client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
         message = client.messages.create(
             body=f"Your verification code is: {otp}. Valid for 5 minutes.",
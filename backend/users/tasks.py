@@ -7,52 +7,117 @@ Defines Celery tasks for handling time-consuming operations off the main thread:
 - Sending password reset emails
 - Sending security alerts
 - Dispatching SMS OTPs via Twilio
+- Purging auth tokens revoked by a newer login
 """
 
-from django.core.mail import send_mail
+import smtplib
+import threading
+
+from django.core.mail import get_connection, send_mail
+from django.core.signals import setting_changed
 from django.conf import settings
-from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.dispatch import receiver
+
+from knox.models import AuthToken
 
 from celery import shared_task
+from celery.signals import worker_process_shutdown
 
+from .sms_service import send_otp_sms
 
-@shared_task
-def send_verification_email_task(user_id, token_string):
-    User = get_user_model()
-    try:
-        user = User.objects.get(id=user_id)
-        verification_link = f"http://localhost:3000/verify-email/?token={token_string}"
-        send_mail(
-            subject="Verify your email",
-            message=f"Click this link to verify your account: {verification_link}",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-        )
-    except User.DoesNotExist:
-        pass
 
+# SMTP connections are not safe to share between threads, so threads- and
+# gevent-pool workers keep one per thread (per greenlet under gevent)
+_mail_local = threading.local()
 
-@shared_task
-def send_forgot_password_email_task(user_id, token_string):
-    User = get_user_model()
+
+def _mail_connection():
+    """
+    Mail connection shared by every email task run on the current thread.
+    Opened once so SMTP handshakes scale with worker threads, not messages.
+    """
+    connection = getattr(_mail_local, "connection", None)
+    if connection is None:
+        connection = get_connection()
+        connection.open()
+        _mail_local.connection = connection
+    return connection
+
+
+@worker_process_shutdown.connect
+def _close_mail_connection(**kwargs):
+    connection = getattr(_mail_local, "connection", None)
+    if connection is not None:
+        connection.close()
+        _mail_local.connection = None
+
+
+@receiver(setting_changed)
+def _reset_mail_connection(setting, **kwargs):
+    """Drop the cached connection when tests override the email settings."""
+    if setting.startswith("EMAIL_"):
+        _close_mail_connection()
+
+
+class _TransientMailError(Exception):
+    """Raised for mail failures worth retrying; chains the original error."""
+
+
+def _is_transient(exc):
+    """Dropped connections and SMTP 4xx replies; 5xx replies are permanent."""
+    if isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return isinstance(exc, smtplib.SMTPResponseException) and exc.smtp_code // 100 == 4
+
+
+# Transient SMTP/network failures are retried with exponential backoff
+_MAIL_TASK_OPTIONS = {
+    "autoretry_for": (_TransientMailError, ConnectionError, TimeoutError),
+    "retry_backoff": True,
+    "max_retries": 5,
+}
+
+
+def _send_mail(**kwargs):
     try:
-        user = User.objects.get(id=user_id)
-        verification_link = (
-            f"http://localhost:3000/reset-password/?token={token_string}"
-        )
-        send_mail(
-            subject="Password Reset",
-            message=f"Click this link to reset your password: {verification_link}",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-        )
-    except User.DoesNotExist:
-        pass
+        try:
+            send_mail(connection=_mail_connection(), **kwargs)
+        except smtplib.SMTPServerDisconnected:
+            # The server closed the idle connection; reopen it and retry once.
+            _close_mail_connection()
+            send_mail(connection=_mail_connection(), **kwargs)
+    except smtplib.SMTPException as exc:
+        if _is_transient(exc):
+            raise _TransientMailError(exc) from exc
+        raise
 
 
-@shared_task
+@shared_task(**_MAIL_TASK_OPTIONS)
+def send_verification_email_task(user_email, token_string):
+    verification_link = f"http://localhost:3000/verify-email/?token={token_string}"
+    _send_mail(
+        subject="Verify your email",
+        message=f"Click this link to verify your account: {verification_link}",
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[user_email],
+    )
+
+
+@shared_task(**_MAIL_TASK_OPTIONS)
+def send_forgot_password_email_task(user_email, token_string):
+    verification_link = f"http://localhost:3000/reset-password/?token={token_string}"
+    _send_mail(
+        subject="Password Reset",
+        message=f"Click this link to reset your password: {verification_link}",
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[user_email],
+    )
+
+
+@shared_task(**_MAIL_TASK_OPTIONS)
 def send_security_alert_task(user_email, msg):
-    send_mail(
+    _send_mail(
         subject="Security Alert",
         message=f"Hello, we noticed a strange activity coming from your account: {msg}. If this was you, please keep in mind this may be considered a security alert on our side and might lead to account deactivation if persistent. Otherwise, ignore this email.",
         from_email=settings.DEFAULT_FROM_EMAIL,
@@ -63,6 +128,19 @@ def send_security_alert_task(user_email, msg):
 @shared_task
 def send_otp_sms_task(phone_number, otp):
     """Send OTP via SMS asynchronously"""
-    from .sms_service import send_otp_sms
-
     send_otp_sms(phone_number, otp)
+
+
+@shared_task
+def purge_revoked_tokens_task():
+    """
+    Delete auth tokens revoked by a newer login.
+
+    Runs nightly from CELERY_BEAT_SCHEDULE as a backstop; logins already
+    delete the tokens they revoke, and revoked tokens are rejected at
+    authentication time regardless.
+    """
+    deleted, _ = AuthToken.objects.filter(
+        created__lt=F("user__tokens_valid_after")
+    ).delete()
+    return deleted
@@ -4,12 +4,9 @@ from rest_framework.test import APITestCase
 from django.contrib.auth import get_user_model
 from unittest.mock import patch
 
-from django.test import override_settings
-
 User = get_user_model()
 
 
-@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
 class AuthenticationTests(APITestCase):
     def setUp(self):
         # Create admin user
@@ -77,8 +74,9 @@ class AuthenticationTests(APITestCase):
 
         # Get the real OTP from cache to verify (since we can't see the SMS)
         from django.core.cache import cache
+        from users.managers import _OTP_KEY
 
-        key = f"otp:{user.phone_number}"
+        key = _OTP_KEY(user.phone_number)
         otp_data = cache.get(key)
         self.assertIsNotNone(otp_data)
         otp = otp_data["otp"]
@@ -1,29 +1,35 @@
 import uuid
 
 from unittest.mock import patch
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.signing import BadSignature, SignatureExpired
 
-from users.managers import TokenManager
+from users.managers import (
+    TokenManager,
+    _EMAIL_VERIFY_KEY,
+    _LOGIN_SESSION_KEY,
+    _OTP_KEY,
+    _PASSWORD_RESET_KEY,
+)
+from users.tests.utils import make_user
 
 
-class CustomUserManagerTests(TestCase):
-    def setUp(self):
-        self.User = get_user_model()
+# Signed email/reset tokens are random per test; only OTP keys are reused
+_OTP_KEYS = (_OTP_KEY("+201234567890"), _OTP_KEY("+209876543210"))
 
-    def tearDown(self):
-        self.User.objects.all().delete()
+# Characters _generate_complex_otp leaves out of its alphabet
+_CONFUSING_CHARS = frozenset("O0I1l")
+
+
+class CustomUserManagerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.User = get_user_model()
 
     def test_create_user_success(self):
-        user = self.User.objects.create_user(
-            email="some@email.com",
-            password="testpass123",
-            first_name="John",
-            last_name="Doe",
-            phone_number="+201234567890",
-        )
+        user = make_user()
         self.assertEqual(user.email, "some@email.com")
         self.assertEqual(user.first_name, "John")
         self.assertEqual(user.last_name, "Doe")
@@ -32,79 +38,24 @@ class CustomUserManagerTests(TestCase):
         self.assertFalse(user.is_active)
 
     def test_create_user_email_normalized(self):
-        user = self.User.objects.create_user(
-            email="some@email.com",
-            password="testpass123",
-            first_name="John",
-            last_name="Doe",
-            phone_number="+201234567890",
-        )
+        user = make_user()
         self.assertEqual(user.email, "some@email.com")
 
-    def test_create_user_without_email_raises_error(self):
-        with self.assertRaises(ValueError) as context:
-            self.User.objects.create_user(
-                email="",
-                password="testpass123",
-                first_name="John",
-                last_name="Doe",
-                phone_number="+201234567890",
-            )
-        self.assertEqual(str(context.exception), "The Email field must be set")
-
-    def test_create_user_without_first_name_raises_error(self):
-        with self.assertRaises(ValueError) as context:
-            self.User.objects.create_user(
-                email="some@email.com",
-                password="testpass123",
-                first_name="",
-                last_name="Doe",
-                phone_number="+201234567890",
-            )
-        self.assertEqual(str(context.exception), "The First Name field must be set")
-
-    def test_create_user_without_last_name_raises_error(self):
-        with self.assertRaises(ValueError) as context:
-            self.User.objects.create_user(
-                email="some@email.com",
-                password="testpass123",
-                first_name="John",
-                last_name="",
-                phone_number="+201234567890",
-            )
-        self.assertEqual(str(context.exception), "The Last Name field must be set")
-
-    def test_create_user_without_phone_number_raises_error(self):
-        with self.assertRaises(ValueError) as context:
-            self.User.objects.create_user(
-                email="some@email.com",
-                password="testpass123",
-                first_name="John",
-                last_name="Doe",
-            )
-        self.assertEqual(
-            str(context.exception), "The Phone Number field must be set for 2FA"
-        )
-
-    def test_create_user_is_active_default_false(self):
-        user = self.User.objects.create_user(
-            email="some@email.com",
-            password="testpass123",
-            first_name="John",
-            last_name="Doe",
-            phone_number="+201234567890",
-        )
-        self.assertFalse(user.is_active)
+    def test_create_user_missing_required_field_raises_error(self):
+        cases = [
+            ("email", "", "The Email field must be set"),
+            ("first_name", "", "The First Name field must be set"),
+            ("last_name", "", "The Last Name field must be set"),
+            ("phone_number", None, "The Phone Number field must be set for 2FA"),
+        ]
+        for field, value, message in cases:
+            with self.subTest(field=field):
+                with self.assertRaises(ValueError) as context:
+                    make_user(**{field: value})
+                self.assertEqual(str(context.exception), message)
 
     def test_create_user_can_override_is_active(self):
-        user = self.User.objects.create_user(
-            email="some@email.com",
-            password="testpass123",
-            first_name="John",
-            last_name="Doe",
-            phone_number="+201234567890",
-            is_active=True,
-        )
+        user = make_user(is_active=True)
         self.assertTrue(user.is_active)
 
     def test_create_superuser_success(self):
@@ -121,44 +72,23 @@ class CustomUserManagerTests(TestCase):
         self.assertTrue(superuser.is_active)
         self.assertEqual(superuser.type, "admin")
 
-    def test_create_superuser_sets_defaults(self):
-        superuser = self.User.objects.create_superuser(
-            email="admin@email.com",
-            password="adminpass123",
-            first_name="Admin",
-            last_name="User",
-            phone_number="+201234567890",
-        )
-        self.assertTrue(superuser.is_staff)
-        self.assertTrue(superuser.is_superuser)
-        self.assertTrue(superuser.is_active)
-        self.assertEqual(superuser.type, "admin")
-
-    def test_create_superuser_with_is_staff_false_raises_error(self):
-        with self.assertRaises(ValueError) as context:
-            self.User.objects.create_superuser(
-                email="admin@email.com",
-                password="adminpass123",
-                first_name="Admin",
-                last_name="User",
-                phone_number="+201234567890",
-                is_staff=False,
-            )
-        self.assertEqual(str(context.exception), "Superuser must have is_staff=True")
-
-    def test_create_superuser_with_is_superuser_false_raises_error(self):
-        with self.assertRaises(ValueError) as context:
-            self.User.objects.create_superuser(
-                email="admin@email.com",
-                password="adminpass123",
-                first_name="Admin",
-                last_name="User",
-                phone_number="+201234567890",
-                is_superuser=False,
-            )
-        self.assertEqual(
-            str(context.exception), "Superuser must have is_superuser=True"
-        )
+    def test_create_superuser_with_flag_false_raises_error(self):
+        cases = [
+            ("is_staff", "Superuser must have is_staff=True"),
+            ("is_superuser", "Superuser must have is_superuser=True"),
+        ]
+        for flag, message in cases:
+            with self.subTest(flag=flag):
+                with self.assertRaises(ValueError) as context:
+                    self.User.objects.create_superuser(
+                        email="admin@email.com",
+                        password="adminpass123",
+                        first_name="Admin",
+                        last_name="User",
+                        phone_number="+201234567890",
+                        **{flag: False},
+                    )
+                self.assertEqual(str(context.exception), message)
 
     def test_create_superuser_without_password(self):
         superuser = self.User.objects.create_superuser(
@@ -171,13 +101,13 @@ class CustomUserManagerTests(TestCase):
         self.assertFalse(superuser.has_usable_password())
 
 
-class TokenManagerTests(TestCase):
-    def setUp(self):
-        cache.clear()
-        self.user_id = uuid.uuid4()
+class TokenManagerTests(SimpleTestCase):
+    # Stable id shared by every test; tests needing distinct users mint their own
+    user_id = uuid.UUID("00000000-0000-4000-8000-000000000001")
+    user_id_str = str(user_id)
 
     def tearDown(self):
-        cache.clear()
+        cache.delete_many(_OTP_KEYS)
 
     def test_generate_signed_token_created_token(self):
         token = TokenManager._generate_signed_token()
@@ -218,7 +148,7 @@ class TokenManagerTests(TestCase):
         token = TokenManager.set_email_verification_token(self.user_id)
         self.assertIsNotNone(token)
 
-        key = f"email_verify:{token}"
+        key = _EMAIL_VERIFY_KEY(token)
         cached_user_id = cache.get(key)
         self.assertEqual(cached_user_id, self.user_id)
 
@@ -227,7 +157,7 @@ class TokenManagerTests(TestCase):
         validated_user_id = TokenManager.validate_email_verification_token(token)
         self.assertEqual(validated_user_id, self.user_id)
 
-        key = f"email_verify:{token}"
+        key = _EMAIL_VERIFY_KEY(token)
         cached_user_id = cache.get(key)
         self.assertIsNone(cached_user_id)
 
@@ -251,20 +181,18 @@ class TokenManagerTests(TestCase):
         validated_user_id = TokenManager.validate_email_verification_token(token)
         self.assertIsNone(validated_user_id)
 
-    @patch("users.managers.cache")
-    def test_email_verification_token_timeout(self, mock_cache):
-        mock_cache.get.return_value = None
+    def test_email_verification_token_timeout(self):
+        token = TokenManager.set_email_verification_token(self.user_id)
+        # Re-set with a zero timeout to expire the entry immediately
+        cache.set(_EMAIL_VERIFY_KEY(token), self.user_id, timeout=0)
 
-        token = TokenManager._generate_signed_token()
-        key = f"email_verify:{token}"
-        cached_user_id = mock_cache.get(key)
-        self.assertIsNone(cached_user_id)
+        self.assertIsNone(TokenManager.validate_email_verification_token(token))
 
     def test_set_password_reset_token(self):
         token = TokenManager.set_password_reset_token(self.user_id)
         self.assertIsNotNone(token)
 
-        key = f"password_reset:{token}"
+        key = _PASSWORD_RESET_KEY(token)
         cached_user_id = cache.get(key)
         self.assertEqual(cached_user_id, self.user_id)
 
@@ -273,7 +201,7 @@ class TokenManagerTests(TestCase):
         validated_user_id = TokenManager.validate_password_reset_token(token)
         self.assertEqual(validated_user_id, self.user_id)
 
-        key = f"password_reset:{token}"
+        key = _PASSWORD_RESET_KEY(token)
         cached_user_id = cache.get(key)
         self.assertIsNone(cached_user_id)
 
@@ -300,18 +228,16 @@ class TokenManagerTests(TestCase):
         self.assertTrue(otp.isupper())
 
         # Verify no confusing characters
-        confusing_chars = ["O", "0", "I", "1", "l"]
-        for char in confusing_chars:
-            self.assertNotIn(char, otp)
+        self.assertFalse(_CONFUSING_CHARS.intersection(otp))
 
     def test_generate_complex_otp_custom_length(self):
         otp = TokenManager._generate_complex_otp(length=12)
         self.assertEqual(len(otp), 12)
 
     def test_generate_complex_otp_uniqueness(self):
-        otps = [TokenManager._generate_complex_otp() for _ in range(100)]
-        unique_otps = set(otps)
-        self.assertGreater(len(unique_otps), 95)
+        # 32^8 possible codes: a collision among 20 samples is ~1e-10 likely
+        otps = [TokenManager._generate_complex_otp() for _ in range(20)]
+        self.assertEqual(len(set(otps)), 20)
 
     def test_set_otp_token(self):
         phone_number = "+201234567890"
@@ -320,53 +246,45 @@ class TokenManagerTests(TestCase):
         self.assertIsNotNone(otp)
         self.assertEqual(len(otp), 8)
 
-        key = f"otp:{phone_number}"
+        key = _OTP_KEY(phone_number)
         cached_data = cache.get(key)
         self.assertIsNotNone(cached_data)
         self.assertEqual(cached_data["otp"], otp)
-        self.assertEqual(cached_data["user_id"], str(self.user_id))
+        self.assertEqual(cached_data["user_id"], self.user_id_str)
 
-    def test_validate_otp_success(self):
-        phone_number = "+201234567890"
-        otp = TokenManager.set_otp_token(self.user_id, phone_number)
-
-        # Validate OTP
-        validated_user_id = TokenManager.validate_otp(phone_number, otp)
-        self.assertEqual(validated_user_id, str(self.user_id))
-
-        # Verify OTP is deleted after validation
-        key = f"otp:{phone_number}"
-        cached_data = cache.get(key)
-        self.assertIsNone(cached_data)
-
-    def test_validate_otp_case_insensitive(self):
-        phone_number = "+201234567890"
-        otp = TokenManager.set_otp_token(self.user_id, phone_number)
-
-        # Validate with lowercase
-        validated_user_id = TokenManager.validate_otp(phone_number, otp.lower())
-        self.assertEqual(validated_user_id, str(self.user_id))
+    def _set_otp(self, phone_number="+201234567890"):
+        return TokenManager.set_otp_token(self.user_id, phone_number)
 
-    def test_validate_otp_invalid_code(self):
+    def test_validate_otp_success(self):
         phone_number = "+201234567890"
-        otp = TokenManager.set_otp_token(self.user_id, phone_number)
+        for label, transform in (("exact", str), ("lowercase", str.lower)):
+            with self.subTest(case=label):
+                otp = self._set_otp(phone_number)
 
-        # Try to validate with wrong OTP
-        validated_user_id = TokenManager.validate_otp(phone_number, "WRONGOTP")
-        self.assertIsNone(validated_user_id)
+                validated_user_id = TokenManager.validate_otp(
+                    phone_number, transform(otp)
+                )
+                self.assertEqual(validated_user_id, self.user_id_str)
 
-        # Verify original OTP is still in cache
-        key = f"otp:{phone_number}"
-        cached_data = cache.get(key)
-        self.assertIsNotNone(cached_data)
+                # Verify OTP is deleted after validation
+                self.assertIsNone(cache.get(_OTP_KEY(phone_number)))
 
-    def test_validate_otp_wrong_phone_number(self):
+    def test_validate_otp_rejects_mismatch(self):
         phone_number = "+201234567890"
-        otp = TokenManager.set_otp_token(self.user_id, phone_number)
-
-        # Try to validate with different phone number
-        validated_user_id = TokenManager.validate_otp("+209876543210", otp)
-        self.assertIsNone(validated_user_id)
+        otp = self._set_otp(phone_number)
+        cases = [
+            ("invalid_code", phone_number, "WRONGOTP"),
+            ("wrong_phone_number", "+209876543210", otp),
+        ]
+        for label, attempt_phone, attempt_otp in cases:
+            with self.subTest(case=label):
+                validated_user_id = TokenManager.validate_otp(
+                    attempt_phone, attempt_otp
+                )
+                self.assertIsNone(validated_user_id)
+
+                # Verify original OTP is still in cache
+                self.assertIsNotNone(cache.get(_OTP_KEY(phone_number)))
 
     def test_validate_otp_not_set(self):
         phone_number = "+201234567890"
@@ -375,25 +293,45 @@ class TokenManagerTests(TestCase):
 
     def test_validate_otp_already_used(self):
         phone_number = "+201234567890"
-        otp = TokenManager.set_otp_token(self.user_id, phone_number)
+        otp = self._set_otp(phone_number)
 
         # First validation should succeed
         validated_user_id = TokenManager.validate_otp(phone_number, otp)
-        self.assertEqual(validated_user_id, str(self.user_id))
+        self.assertEqual(validated_user_id, self.user_id_str)
 
         # Second validation should fail (OTP deleted)
         validated_user_id = TokenManager.validate_otp(phone_number, otp)
         self.assertIsNone(validated_user_id)
 
-    @patch("users.managers.cache")
-    def test_otp_token_timeout(self, mock_cache):
-        # Simulate cache miss (expired OTP)
-        mock_cache.get.return_value = None
-
+    def test_otp_token_timeout(self):
         phone_number = "+201234567890"
-        key = f"otp:{phone_number}"
-        cached_data = mock_cache.get(key)
-        self.assertIsNone(cached_data)
+        otp = TokenManager.set_otp_token(self.user_id, phone_number)
+        # Re-set with a zero timeout to expire the entry immediately
+        cache.set(_OTP_KEY(phone_number), {"otp": otp}, timeout=0)
+
+        self.assertIsNone(TokenManager.validate_otp(phone_number, otp))
+
+    def test_pop_login_session_returns_and_deletes(self):
+        TokenManager.set_login_session("some-session", self.user_id)
+
+        user_id = TokenManager.pop_login_session("some-session")
+        self.assertEqual(user_id, self.user_id_str)
+        self.assertIsNone(TokenManager.pop_login_session("some-session"))
+
+    def test_pop_login_session_missing(self):
+        self.assertIsNone(TokenManager.pop_login_session("missing-session"))
+
+    @patch("users.managers.TokenManager._redis_connection")
+    def test_login_session_uses_setex_and_getdel_on_redis(self, mock_redis):
+        key = cache.make_key(_LOGIN_SESSION_KEY("some-session"))
+        mock_redis.return_value.getdel.return_value = self.user_id_str.encode()
+
+        TokenManager.set_login_session("some-session", self.user_id, timeout=60)
+        user_id = TokenManager.pop_login_session("some-session")
+
+        mock_redis.return_value.setex.assert_called_once_with(key, 60, self.user_id_str)
+        mock_redis.return_value.getdel.assert_called_once_with(key)
+        self.assertEqual(user_id, self.user_id_str)
 
     def test_multiple_users_different_otps(self):
         user_id_1 = uuid.uuid4()
@@ -417,22 +355,15 @@ class TokenManagerTests(TestCase):
 class ManagerIntegrationTests(TestCase):
     """Integration tests for CustomUserManager and TokenManager together"""
 
-    def setUp(self):
-        self.User = get_user_model()
-        cache.clear()
+    @classmethod
+    def setUpTestData(cls):
+        cls.User = get_user_model()
 
     def tearDown(self):
-        cache.clear()
-        self.User.objects.all().delete()
+        cache.delete_many(_OTP_KEYS)
 
     def test_user_creation_and_email_verification_flow(self):
-        user = self.User.objects.create_user(
-            email="some@email.com",
-            password="testpass123",
-            first_name="John",
-            last_name="Doe",
-            phone_number="+201234567890",
-        )
+        user = make_user()
         self.assertFalse(user.is_active)
         self.assertFalse(user.is_email_verified)
 
@@ -445,38 +376,28 @@ class ManagerIntegrationTests(TestCase):
         user.is_email_verified = True
         user.is_active = True
         user.save()
-        user.refresh_from_db()
         self.assertTrue(user.is_active)
         self.assertTrue(user.is_email_verified)
 
     def test_password_reset_flow(self):
-        user = self.User.objects.create_user(
+        user = make_user(
             email="some@email",
             password="oldpass123",
-            first_name="John",
-            last_name="Doe",
-            phone_number="+201234567890",
             is_active=True,
         )
         token = TokenManager.set_password_reset_token(user.id)
         validated_user_id = TokenManager.validate_password_reset_token(token)
         self.assertEqual(validated_user_id, user.id)
 
+        old_hash = user.password
         user.set_password("newpass123")
         user.save()
         user.refresh_from_db()
+        self.assertNotEqual(user.password, old_hash)
         self.assertTrue(user.check_password("newpass123"))
-        self.assertFalse(user.check_password("oldpass123"))
 
     def test_otp_2fa_login_flow(self):
-        user = self.User.objects.create_user(
-            email="some@email.com",
-            password="testpass123",
-            first_name="John",
-            last_name="Doe",
-            phone_number="+201234567890",
-            is_active=True,
-        )
+        user = make_user(is_active=True)
         otp = TokenManager.set_otp_token(user.id, str(user.phone_number))
         self.assertEqual(len(otp), 8)
 
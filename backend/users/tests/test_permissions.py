@@ -1,6 +1,12 @@
+from itertools import product
+from types import SimpleNamespace
+
 from django.test import TestCase
-from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpRequest
 
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
 from rest_framework.test import APIRequestFactory
 
 from users.permissions import (
@@ -9,67 +15,76 @@ from users.permissions import (
     IsEmailVerified,
     CanCreateUserType,
 )
+from users.tests.utils import bulk_create_users
 
 
-class IsAdminPermissionTests(TestCase):
-    def setUp(self):
-        self.User = get_user_model()
-        self.factory = APIRequestFactory()
-        self.permission = IsAdmin()
+# Neither holds per-request state, so every test can share one instance
+_ANON = AnonymousUser()
+_FACTORY = APIRequestFactory()
 
-        self.admin_user = self.User.objects.create_user(
-            email="admin@email.com",
-            password="testpass123",
-            first_name="Admin",
-            last_name="User",
-            phone_number="+201234567890",
-            type="admin",
-            is_active=True,
-        )
+_HTTP_METHODS = ("get", "post", "put", "patch", "delete")
 
-        self.manager_user = self.User.objects.create_user(
-            email="manager@email.com",
-            password="testpass123",
-            first_name="Manager",
-            last_name="User",
-            phone_number="+201234567891",
-            type="manager",
-            is_active=True,
-        )
 
-        self.staff_user = self.User.objects.create_user(
-            email="staff@email.com",
-            password="testpass123",
-            first_name="Staff",
-            last_name="User",
-            phone_number="+201234567892",
-            type="staff",
-            is_active=True,
-        )
+def _http_request(user, method="GET"):
+    """Bare request for permissions that only look at request.user"""
+    request = HttpRequest()
+    request.method = method
+    request.user = user
+    return request
+
+
+_ROLES = ("admin", "manager", "staff")
+
+
+def _build_role_users():
+    """Create one active user per role, keyed by type"""
+    users = bulk_create_users(
+        *(
+            {
+                "email": f"{role}@email.com",
+                "first_name": role.capitalize(),
+                "last_name": "User",
+                "phone_number": f"+20123456789{i}",
+                "type": role,
+            }
+            for i, role in enumerate(_ROLES)
+        ),
+    )
+    return dict(zip(_ROLES, users))
+
+
+class RoleUsersMixin:
+    """Creates one admin, manager and staff user per test class"""
+
+    @classmethod
+    def setUpTestData(cls):
+        role_users = _build_role_users()
+        cls.admin_user = role_users["admin"]
+        cls.manager_user = role_users["manager"]
+        cls.staff_user = role_users["staff"]
+
+
+class IsAdminPermissionTests(RoleUsersMixin, TestCase):
+    def setUp(self):
+        self.permission = IsAdmin()
 
     def test_admin_user_has_permission(self):
-        request = self.factory.get("/")
-        request.user = self.admin_user
+        request = _http_request(self.admin_user)
         permission = self.permission.has_permission(request, None)
         self.assertTrue(permission)
 
     def test_manager_user_denied_permission(self):
-        request = self.factory.get("/")
-        request.user = self.manager_user
+        request = _http_request(self.manager_user)
         permission = self.permission.has_permission(request, None)
         self.assertFalse(permission)
 
     def test_staff_user_denied_permission(self):
-        request = self.factory.get("/")
-        request.user = self.staff_user
+        request = _http_request(self.staff_user)
         permission = self.permission.has_permission(request, None)
         self.assertFalse(permission)
 
     def test_unauthenticated_user_denied_permission(self):
-        from django.contrib.auth.models import AnonymousUser
-
-        request = self.factory.get("/")
-        request.user = AnonymousUser()
+        request = _http_request(_ANON)
         permission = self.permission.has_permission(request, None)
         self.assertFalse(permission)
 
@@ -79,74 +94,34 @@ class IsAdminPermissionTests(TestCase):
         )
 
     def test_admin_user_all_http_methods(self):
-        methods = ["get", "post", "put", "patch", "delete"]
-        for method in methods:
+        for method in _HTTP_METHODS:
             with self.subTest(method=method):
-                request = getattr(self.factory, method)("/")
-                request.user = self.admin_user
+                request = _http_request(self.admin_user, method.upper())
                 permission = self.permission.has_permission(request, None)
                 self.assertTrue(permission)
 
 
-class IsAdminOrManagerPermissionTests(TestCase):
+class IsAdminOrManagerPermissionTests(RoleUsersMixin, TestCase):
     def setUp(self):
-        self.User = get_user_model()
-        self.factory = APIRequestFactory()
         self.permission = IsAdminOrManager()
 
-        self.admin_user = self.User.objects.create_user(
-            email="admin@email.com",
-            password="testpass123",
-            first_name="Admin",
-            last_name="User",
-            phone_number="+201234567890",
-            type="admin",
-            is_active=True,
-        )
-
-        self.manager_user = self.User.objects.create_user(
-            email="manager@email.com",
-            password="testpass123",
-            first_name="Manager",
-            last_name="User",
-            phone_number="+201234567891",
-            type="manager",
-            is_active=True,
-        )
-
-        self.staff_user = self.User.objects.create_user(
-            email="staff@email.com",
-            password="testpass123",
-            first_name="Staff",
-            last_name="User",
-            phone_number="+201234567892",
-            type="staff",
-            is_active=True,
-        )
-
     def test_admin_user_has_permission(self):
-        request = self.factory.get("/")
-        request.user = self.admin_user
+        request = _http_request(self.admin_user)
         permission = self.permission.has_permission(request, None)
         self.assertTrue(permission)
 
     def test_manager_user_has_permission(self):
-        request = self.factory.get("/")
-        request.user = self.manager_user
+        request = _http_request(self.manager_user)
         permission = self.permission.has_permission(request, None)
         self.assertTrue(permission)
 
     def test_staff_user_denied_permission(self):
-        request = self.factory.get("/")
-        request.user = self.staff_user
+        request = _http_request(self.staff_user)
         permission = self.permission.has_permission(request, None)
         self.assertFalse(permission)
 
     def test_unauthenticated_user_denied_permission(self):
-        from django.contrib.auth.models import AnonymousUser
-
-        request = self.factory.get("/")
-        request.user = AnonymousUser()
+        request = _http_request(_ANON)
         permission = self.permission.has_permission(request, None)
         self.assertFalse(permission)
 
@@ -157,62 +132,72 @@ class IsAdminOrManagerPermissionTests(TestCase):
         )
 
     def test_admin_and_manager_all_http_methods(self):
-        methods = ["get", "post", "put", "patch", "delete"]
         users = [self.admin_user, self.manager_user]
 
-        for user in users:
-            for method in methods:
-                with self.subTest(user=user.type, method=method):
-                    request = getattr(self.factory, method)("/")
-                    request.user = user
+        for user, method in product(users, _HTTP_METHODS):
+            with self.subTest(user=user.type, method=method):
+                request = _http_request(user, method.upper())
 
-                    permission = self.permission.has_permission(request, None)
-                    self.assertTrue(permission)
+                permission = self.permission.has_permission(request, None)
+                self.assertTrue(permission)
 
 
 class IsEmailVerifiedPermissionTests(TestCase):
-    def setUp(self):
-        self.User = get_user_model()
-        self.factory = APIRequestFactory()
-        self.permission = IsEmailVerified()
-
-        self.verified_user = self.User.objects.create_user(
-            email="verified@email.com",
-            password="testpass123",
-            first_name="Verified",
-            last_name="User",
-            phone_number="+201234567890",
-            is_active=True,
-            is_email_verified=True,
+    @classmethod
+    def setUpTestData(cls):
+        (
+            cls.verified_user,
+            cls.unverified_user,
+            cls.verified_admin,
+            cls.unverified_admin,
+        ) = bulk_create_users(
+            {
+                "email": "verified@email.com",
+                "first_name": "Verified",
+                "last_name": "User",
+                "phone_number": "+201234567890",
+                "is_email_verified": True,
+            },
+            {
+                "email": "unverified@email.com",
+                "first_name": "Unverified",
+                "last_name": "User",
+                "phone_number": "+201234567891",
+                "is_email_verified": False,
+            },
+            {
+                "email": "verified-admin@email.com",
+                "first_name": "Admin",
+                "last_name": "User",
+                "phone_number": "+201234567892",
+                "type": "admin",
+                "is_email_verified": True,
+            },
+            {
+                "email": "unverified-admin@email.com",
+                "first_name": "Admin",
+                "last_name": "User",
+                "phone_number": "+201234567893",
+                "type": "admin",
+                "is_email_verified": False,
+            },
         )
 
-        self.unverified_user = self.User.objects.create_user(
-            email="unverified@email.com",
-            password="testpass123",
-            first_name="Unverified",
-            last_name="User",
-            phone_number="+201234567891",
-            is_active=True,
-            is_email_verified=False,
-        )
+    def setUp(self):
+        self.permission = IsEmailVerified()
 
     def test_verified_user_has_permission(self):
-        request = self.factory.get("/")
-        request.user = self.verified_user
+        request = _http_request(self.verified_user)
         permission = self.permission.has_permission(request, None)
         self.assertTrue(permission)
 
     def test_unverified_user_denied_permission(self):
-        request = self.factory.get("/")
-        request.user = self.unverified_user
+        request = _http_request(self.unverified_user)
         permission = self.permission.has_permission(request, None)
         self.assertFalse(permission)
 
     def test_unauthenticated_user_denied_permission(self):
-        from django.contrib.auth.models import AnonymousUser
-
-        request = self.factory.get("/")
-        request.user = AnonymousUser()
+        request = _http_request(_ANON)
         permission = self.permission.has_permission(request, None)
         self.assertFalse(permission)
 
@@ -222,178 +207,107 @@ class IsEmailVerifiedPermissionTests(TestCase):
         )
 
     def test_verified_user_all_http_methods(self):
-        methods = ["get", "post", "put", "patch", "delete"]
-        for method in methods:
+        for method in _HTTP_METHODS:
             with self.subTest(method=method):
-                request = getattr(self.factory, method)("/")
-                request.user = self.verified_user
+                request = _http_request(self.verified_user, method.upper())
                 permission = self.permission.has_permission(request, None)
                 self.assertTrue(permission)
 
     def test_admin_user_with_verified_email(self):
-        admin_user = self.User.objects.create_user(
-            email="[email protected]",
-            password="testpass123",
-            first_name="Admin",
-            last_name="User",
-            phone_number="+201234567892",
-            type="admin",
-            is_active=True,
-            is_email_verified=True,
-        )
-
-        request = self.factory.get("/")
-        request.user = admin_user
+        request = _http_request(self.verified_admin)
 
         permission = self.permission.has_permission(request, None)
         self.assertTrue(permission)
 
     def test_admin_user_without_verified_email_denied(self):
-        admin_user = self.User.objects.create_user(
-            email="[email protected]",
-            password="testpass123",
-            first_name="Admin",
-            last_name="User",
-            phone_number="+201234567893",
-            type="admin",
-            is_active=True,
-            is_email_verified=False,
-        )
-
-        request = self.factory.get("/")
-        request.user = admin_user
+        request = _http_request(self.unverified_admin)
 
         permission = self.permission.has_permission(request, None)
         self.assertFalse(permission)
 
 
-class CanCreateUserTypePermissionTests(TestCase):
+class CanCreateUserTypePermissionTests(RoleUsersMixin, TestCase):
     def setUp(self):
-        self.User = get_user_model()
-        self.factory = APIRequestFactory()
+        self.factory = _FACTORY
         self.permission = CanCreateUserType()
 
-        # Create test users
-        self.admin_user = self.User.objects.create_user(
-            email="admin@email.com",
-            password="testpass123",
-            first_name="Admin",
-            last_name="User",
-            phone_number="+201234567890",
-            type="admin",
-            is_active=True,
-        )
-
-        self.manager_user = self.User.objects.create_user(
-            email="manager@email.com",
-            password="testpass123",
-            first_name="Manager",
-            last_name="User",
-            phone_number="+201234567891",
-            type="manager",
-            is_active=True,
-        )
-
-        self.staff_user = self.User.objects.create_user(
-            email="staff@email.com",
-            password="testpass123",
-            first_name="Staff",
-            last_name="User",
-            phone_number="+201234567892",
-            type="staff",
-            is_active=True,
-        )
-
-    def _wrap_request(self, request, user):
-        from rest_framework.request import Request
-        from rest_framework.parsers import JSONParser, FormParser, MultiPartParser
+    def _request(self, user, data, method="POST"):
+        # The permission only reads user and data, so skip DRF request parsing
+        return SimpleNamespace(user=user, data=data, method=method)
 
-        drf_request = Request(
-            request, parsers=[JSONParser(), FormParser(), MultiPartParser()]
+    def test_reads_type_from_parsed_request_body(self):
+        request = Request(
+            self.factory.post("/", {"type": "manager"}, format="json"),
+            parsers=[JSONParser()],
         )
-        drf_request.user = user
-        return drf_request
+        request.user = self.admin_user
+        self.assertTrue(self.permission.has_permission(request, None))
 
     def test_admin_can_create_manager(self):
-        request = self.factory.post("/", {"type": "manager"}, format="json")
-        request = self._wrap_request(request, self.admin_user)
+        request = self._request(self.admin_user, {"type": "manager"})
         permission = self.permission.has_permission(request, None)
         self.assertTrue(permission)
 
     def test_admin_can_create_staff(self):
-        request = self.factory.post("/", {"type": "staff"}, format="json")
-        request = self._wrap_request(request, self.admin_user)
+        request = self._request(self.admin_user, {"type": "staff"})
         permission = self.permission.has_permission(request, None)
         self.assertTrue(permission)
 
     def test_admin_cannot_create_admin(self):
-        request = self.factory.post("/", {"type": "admin"}, format="json")
-        request = self._wrap_request(request, self.admin_user)
+        request = self._request(self.admin_user, {"type": "admin"})
         permission = self.permission.has_permission(request, None)
         self.assertFalse(permission)
 
     def test_admin_creates_staff_by_default(self):
-        request = self.factory.post("/", {}, format="json")
-        request = self._wrap_request(request, self.admin_user)
+        request = self._request(self.admin_user, {})
         permission = self.permission.has_permission(request, None)
         self.assertTrue(permission)
 
     # Manager user tests
     def test_manager_can_create_staff(self):
-        request = self.factory.post("/", {"type": "staff"}, format="json")
-        request = self._wrap_request(request, self.manager_user)
+        request = self._request(self.manager_user, {"type": "staff"})
         permission = self.permission.has_permission(request, None)
         self.assertTrue(permission)
 
     def test_manager_cannot_create_manager(self):
-        request = self.factory.post("/", {"type": "manager"}, format="json")
-        request = self._wrap_request(request, self.manager_user)
+        request = self._request(self.manager_user, {"type": "manager"})
         permission = self.permission.has_permission(request, None)
         self.assertFalse(permission)
 
     def test_manager_cannot_create_admin(self):
-        request = self.factory.post("/", {"type": "admin"}, format="json")
-        request = self._wrap_request(request, self.manager_user)
+        request = self._request(self.manager_user, {"type": "admin"})
         permission = self.permission.has_permission(request, None)
         self.assertFalse(permission)
 
     def test_manager_creates_staff_by_default(self):
-        request = self.factory.post("/", {}, format="json")
-        request = self._wrap_request(request, self.manager_user)
+        request = self._request(self.manager_user, {})
         permission = self.permission.has_permission(request, None)
         self.assertTrue(permission)
 
     # Staff user tests
     def test_staff_cannot_create_staff(self):
-        request = self.factory.post("/", {"type": "staff"}, format="json")
-        request = self._wrap_request(request, self.staff_user)
+        request = self._request(self.staff_user, {"type": "staff"})
         permission = self.permission.has_permission(request, None)
         self.assertFalse(permission)
 
     def test_staff_cannot_create_manager(self):
-        request = self.factory.post("/", {"type": "manager"}, format="json")
-        request = self._wrap_request(request, self.staff_user)
+        request = self._request(self.staff_user, {"type": "manager"})
         permission = self.permission.has_permission(request, None)
         self.assertFalse(permission)
 
     def test_staff_cannot_create_admin(self):
-        request = self.factory.post("/", {"type": "admin"}, format="json")
-        request = self._wrap_request(request, self.staff_user)
+        request = self._request(self.staff_user, {"type": "admin"})
         permission = self.permission.has_permission(request, None)
         self.assertFalse(permission)
 
     def test_staff_cannot_create_default_type(self):
-        request = self.factory.post("/", {}, format="json")
-        request = self._wrap_request(request, self.staff_user)
+        request = self._request(self.staff_user, {})
         permission = self.permission.has_permission(request, None)
         self.assertFalse(permission)
 
     # Unauthenticated user tests
     def test_unauthenticated_user_denied_permission(self):
-        from django.contrib.auth.models import AnonymousUser
-
-        request = self.factory.post("/", {"type": "staff"}, format="json")
-        request = self._wrap_request(request, AnonymousUser())
+        request = self._request(_ANON, {"type": "staff"})
         permission = self.permission.has_permission(request, None)
         self.assertFalse(permission)
 
@@ -406,59 +320,49 @@ class CanCreateUserTypePermissionTests(TestCase):
 
     # Edge cases
     def test_invalid_user_type_string(self):
-        request = self.factory.post("/", {"type": "invalid"}, format="json")
-        request = self._wrap_request(request, self.admin_user)
+        request = self._request(self.admin_user, {"type": "invalid"})
         permission = self.permission.has_permission(request, None)
         self.assertFalse(permission)
 
     def test_empty_string_user_type(self):
-        request = self.factory.post("/", {"type": ""}, format="json")
-        request = self._wrap_request(request, self.admin_user)
+        request = self._request(self.admin_user, {"type": ""})
         permission = self.permission.has_permission(request, None)
         self.assertFalse(permission)
 
     def test_none_user_type_defaults_to_staff(self):
-        request = self.factory.post("/", {"type": None}, format="json")
-        request = self._wrap_request(request, self.admin_user)
+        request = self._request(self.admin_user, {"type": None})
         permission = self.permission.has_permission(request, None)
         self.assertTrue(permission)
 
     def test_case_sensitive_user_type(self):
-        request = self.factory.post("/", {"type": "Manager"}, format="json")
-        request = self._wrap_request(request, self.admin_user)
+        request = self._request(self.admin_user, {"type": "Manager"})
         permission = self.permission.has_permission(request, None)
         self.assertFalse(permission)
 
     # Test with different HTTP methods
     def test_permission_with_put_request(self):
-        request = self.factory.put("/", {"type": "staff"}, format="json")
-        request = self._wrap_request(request, self.admin_user)
+        request = self._request(self.admin_user, {"type": "staff"}, method="PUT")
         permission = self.permission.has_permission(request, None)
         self.assertTrue(permission)
 
     def test_permission_with_patch_request(self):
-        request = self.factory.patch("/", {"type": "manager"}, format="json")
-        request = self._wrap_request(request, self.admin_user)
+        request = self._request(self.admin_user, {"type": "manager"}, method="PATCH")
         permission = self.permission.has_permission(request, None)
         self.assertTrue(permission)
 
     # Hierarchical permission tests
     def test_permission_hierarchy_admin_over_manager(self):
-        request = self.factory.post("/", {"type": "manager"}, format="json")
-        request = self._wrap_request(request, self.admin_user)
+        request = self._request(self.admin_user, {"type": "manager"})
         self.assertTrue(self.permission.has_permission(request, None))
 
     def test_permission_hierarchy_manager_cannot_create_manager(self):
-        request = self.factory.post("/", {"type": "manager"}, format="json")
-        request = self._wrap_request(request, self.manager_user)
+        request = self._request(self.manager_user, {"type": "manager"})
         self.assertFalse(self.permission.has_permission(request, None))
 
     def test_permission_hierarchy_manager_over_staff(self):
-        request = self.factory.post("/", {"type": "staff"}, format="json")
-        request = self._wrap_request(request, self.manager_user)
+        request = self._request(self.manager_user, {"type": "staff"})
         self.assertTrue(self.permission.has_permission(request, None))
 
     def test_permission_hierarchy_staff_cannot_create_staff(self):
-        request = self.factory.post("/", {"type": "staff"}, format="json")
-        request = self._wrap_request(request, self.staff_user)
+        request = self._request(self.staff_user, {"type": "staff"})
         self.assertFalse(self.permission.has_permission(request, None))
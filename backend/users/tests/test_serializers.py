@@ -1,16 +1,18 @@
-from unittest.mock import patch, MagicMock
+from types import SimpleNamespace
+from unittest.mock import DEFAULT, patch, MagicMock
 
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.core.cache import cache
 from django.test import override_settings
 
-from rest_framework.test import APIRequestFactory
-from rest_framework import serializers
+from rest_framework import serializers, exceptions
 
 from knox.models import AuthToken
 
+from users.authentication import CachedTokenAuthentication, TokenAuthentication
+from users.managers import TokenManager, _OTP_KEY
 from users.serializers import (
     CreateUserSerializer,
     ActivateAccountSerializer,
@@ -21,50 +23,53 @@ from users.serializers import (
     ForgotPasswordRequestSerializer,
     ForgotPasswordResetSerializer,
 )
+from users.tests.utils import PASSWORD_HASH, bulk_create_users
+
+User = get_user_model()
+
+
+# Fields shared by every CreateUserSerializer payload; tests add email and type
+_BASE_CREATE = {
+    "first_name": "John",
+    "last_name": "Doe",
+    "phone_number": "+201234567892",
+}
+
+
+def _req(user=None):
+    """Stand-in request for serializer context; only .user is ever read"""
+    return SimpleNamespace(user=user)
 
 
 class CreateUserSerializerTests(TestCase):
-    def setUp(self):
-        self.User = get_user_model()
-        self.factory = APIRequestFactory()
-        self.admin_user = self.User.objects.create_user(
-            email="admin@email.com",
-            password="adminpass",
-            first_name="Admin",
-            last_name="User",
-            phone_number="+201234567890",
-            type="admin",
-            is_active=True,
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user, cls.manager_user = bulk_create_users(
+            {
+                "email": "admin@email.com",
+                "first_name": "Admin",
+                "last_name": "User",
+                "phone_number": "+201234567890",
+                "type": "admin",
+            },
+            {
+                "email": "manager@email.com",
+                "first_name": "Manager",
+                "last_name": "User",
+                "phone_number": "+201234567891",
+                "type": "manager",
+            },
         )
-        self.manager_user = self.User.objects.create_user(
-            email="manager@email.com",
-            password="managerpass",
-            first_name="Manager",
-            last_name="User",
-            phone_number="+201234567891",
-            type="manager",
-            is_active=True,
-        )
-        cache.clear()
 
     @patch("users.serializers.TokenManager.set_email_verification_token")
     @patch("users.serializers.send_verification_email")
     def test_create_user_admin_success(self, mock_email, mock_token):
         mock_token.return_value = "test-token"
-        data = {
-            "email": "manager0@email.com",
-            "first_name": "John",
-            "last_name": "Doe",
-            "phone_number": "+201234567892",
-            "type": "manager",
-        }
-        # Create a mock request with the admin user
-        mock_request = MagicMock()
-        mock_request.user = self.admin_user
+        data = {**_BASE_CREATE, "email": "manager0@email.com", "type": "manager"}
 
         serializer = CreateUserSerializer(
             data=data,
-            context={"request": mock_request},
+            context={"request": _req(self.admin_user)},
         )
         self.assertTrue(serializer.is_valid())
 
@@ -76,66 +81,42 @@ class CreateUserSerializerTests(TestCase):
         mock_email.assert_called_once_with(user, "test-token")
 
     def test_create_user_email_already_exists(self):
-        data = {
-            "email": "manager@email.com",
-            "first_name": "John",
-            "last_name": "Doe",
-            "phone_number": "+201234567892",
-        }
-        mock_request = MagicMock()
-        mock_request.user = self.admin_user
-        serializer = CreateUserSerializer(data=data, context={"request": mock_request})
+        data = {**_BASE_CREATE, "email": "manager@email.com"}
+        serializer = CreateUserSerializer(
+            data=data, context={"request": _req(self.admin_user)}
+        )
         self.assertFalse(serializer.is_valid())
         self.assertIn("email", serializer.errors)
 
-    def test_admin_cannot_create_admin(self):
-        data = {
-            "email": "admin01@email.com",
-            "first_name": "John",
-            "last_name": "Doe",
-            "phone_number": "+201234567892",
-            "type": "admin",
-        }
-        mock_request = MagicMock()
-        mock_request.user = self.admin_user
-        serializer = CreateUserSerializer(data=data, context={"request": mock_request})
-        self.assertFalse(serializer.is_valid())
-        self.assertIn("type", serializer.errors)
+    def test_requester_cannot_create_own_type_or_above(self):
+        cases = [
+            ("admin", self.admin_user, "admin01@email.com"),
+            ("manager", self.manager_user, "manager01@email.com"),
+        ]
+        for user_type, requester, email in cases:
+            with self.subTest(user_type=user_type):
+                data = {**_BASE_CREATE, "email": email, "type": user_type}
+                serializer = CreateUserSerializer(
+                    data=data, context={"request": _req(requester)}
+                )
+                self.assertFalse(serializer.is_valid())
+                self.assertIn("type", serializer.errors)
 
     def test_manager_can_create_staff(self):
-        data = {
-            "email": "staff@email.com",
-            "first_name": "staff",
-            "last_name": "User",
-            "phone_number": "+201234567893",
-            "type": "staff",
-        }
-        mock_request = MagicMock()
-        mock_request.user = self.manager_user
-        serializer = CreateUserSerializer(data=data, context={"request": mock_request})
+        data = {**_BASE_CREATE, "email": "staff@email.com", "type": "staff"}
+        serializer = CreateUserSerializer(
+            data=data, context={"request": _req(self.manager_user)}
+        )
         self.assertTrue(serializer.is_valid())
 
-    def test_manager_cannot_create_manager(self):
-        data = {
-            "email": "manager01@email.com",
-            "first_name": "Manager",
-            "last_name": "User",
-            "phone_number": "+201234567893",
-            "type": "manager",
-        }
-        mock_request = MagicMock()
-        mock_request.user = self.manager_user
-        serializer = CreateUserSerializer(data=data, context={"request": mock_request})
-        self.assertFalse(serializer.is_valid())
-        self.assertIn("type", serializer.errors)
+    def test_fields_are_not_shared_between_instances(self):
+        first, second = CreateUserSerializer(), CreateUserSerializer()
+        self.assertIsNot(first.fields["email"], second.fields["email"])
+        self.assertIs(first.fields["email"].parent, first)
+        self.assertIs(second.fields["email"].parent, second)
 
     def test_no_request_context_fails(self):
-        data = {
-            "email": "[email protected]",
-            "first_name": "John",
-            "last_name": "Doe",
-            "phone_number": "+201234567892",
-        }
+        data = {**_BASE_CREATE, "email": "[email protected]"}
         serializer = CreateUserSerializer(data=data)
         self.assertFalse(serializer.is_valid())
         self.assertIn("type", serializer.errors)
@@ -143,10 +124,9 @@ class CreateUserSerializerTests(TestCase):
 
 
 class ActivateAccountSerializerTests(TestCase):
-    def setUp(self):
-        self.User = get_user_model()
-        cache.clear()
-        self.user = self.User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             email="[email protected]",
             password=None,
             first_name="John",
@@ -156,12 +136,19 @@ class ActivateAccountSerializerTests(TestCase):
             is_email_verified=False,
         )
 
-    def test_valid_token_activates_account(self):
-        from users.managers import TokenManager
+        # Consumed by test_valid_token_activates_account; tests that need
+        # their own token against a modified user still mint one
+        cls.valid_token = TokenManager.set_email_verification_token(cls.user.id)
 
-        token = TokenManager.set_email_verification_token(self.user.id)
+    @classmethod
+    def setUpClass(cls):
+        # Clear before setUpTestData stores the class token
+        cache.clear()
+        super().setUpClass()
+
+    def test_valid_token_activates_account(self):
         data = {
-            "token": token,
+            "token": self.valid_token,
             "password": "newSecurePassword123!",
             "password2": "newSecurePassword123!",
         }
@@ -201,8 +188,6 @@ class ActivateAccountSerializerTests(TestCase):
         self.user.set_password("existing")
         self.user.save()
 
-        from users.managers import TokenManager
-
         token = TokenManager.set_email_verification_token(self.user.id)
         data = {
             "token": token,
@@ -215,34 +200,38 @@ class ActivateAccountSerializerTests(TestCase):
 
 
 class LoginStep1SerializerTests(TestCase):
-    def setUp(self):
-        self.User = get_user_model()
-        self.user = self.User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
             email="john.doe@example.com",
-            password="testpass123",
+            password=PASSWORD_HASH,
             first_name="John",
             last_name="Doe",
             phone_number="+201234567890",
             is_active=True,
             is_email_verified=True,
         )
-        cache.clear()
 
     @patch("users.serializers.authenticate")
-    @patch("users.serializers.TokenManager.set_otp_token")
     @patch("users.tasks.send_otp_sms_task.delay")
-    @patch("django.core.cache.cache.set")
-    def test_successful_step1(self, mock_cache, mock_sms, mock_otp, mock_auth):
+    @patch.multiple(
+        "users.serializers.TokenManager",
+        set_otp_token=DEFAULT,
+        set_login_session=DEFAULT,
+    )
+    def test_successful_step1(
+        self, mock_sms, mock_auth, set_otp_token, set_login_session
+    ):
         """Test successful password verification and OTP sending"""
         # Mock authenticate to return the test user
         mock_auth.return_value = self.user
-        mock_otp.return_value = "ABCD5678"
+        set_otp_token.return_value = "ABCD5678"
 
         data = {
             "email": "john.doe@example.com",
             "password": "testpass123",
         }
-        mock_request = MagicMock()
+        mock_request = _req()
         serializer = LoginStep1Serializer(data=data, context={"request": mock_request})
 
         self.assertTrue(serializer.is_valid())
@@ -251,9 +240,11 @@ class LoginStep1SerializerTests(TestCase):
         result = serializer.create_session_and_send_otp()
         self.assertIn("OTP sent", result["message"])
         self.assertIn(str(self.user.phone_number)[-4:], result["message"])
-        mock_otp.assert_called_once()
+        set_otp_token.assert_called_once()
         mock_sms.assert_called_once()
-        mock_cache.assert_called_once()
+        set_login_session.assert_called_once_with(
+            result["session_token"], self.user.id, timeout=300
+        )
 
     def test_user_not_found(self):
         data = {"email": "nonexistent@example.com", "password": "pass"}
@@ -263,7 +254,7 @@ class LoginStep1SerializerTests(TestCase):
         self.assertEqual(serializer.errors["non_field_errors"][0].code, "authorization")
 
     def test_account_not_activated(self):
-        user = self.User.objects.create_user(
+        user = User.objects.create_user(
             email="[email protected]",
             password=None,
             first_name="Inactive",
@@ -276,49 +267,69 @@ class LoginStep1SerializerTests(TestCase):
         self.assertIn("non_field_errors", serializer.errors)
         self.assertEqual(serializer.errors["non_field_errors"][0].code, "authorization")
 
-    def test_no_phone_number(self):
+    @patch("users.serializers.authenticate")
+    def test_unactivated_account_skips_password_check(self, mock_auth):
+        User.objects.create_user(
+            email="pending@example.com",
+            password=None,
+            first_name="Pending",
+            last_name="User",
+            phone_number="+201234567891",
+        )
+        data = {"email": "pending@example.com", "password": "pass"}
+        serializer = LoginStep1Serializer(data=data)
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors["non_field_errors"][0].code, "not_activated")
+        mock_auth.assert_not_called()
+
+    @patch("users.serializers.CustomUser.objects.get")
+    @patch("users.serializers.authenticate")
+    def test_no_phone_number(self, mock_auth, mock_get):
         mock_user = MagicMock()
         mock_user.phone_number = None
         mock_user.email = "nophone@email.com"
+        mock_auth.return_value = mock_user
+        mock_get.return_value = mock_user
 
-        with patch("users.serializers.authenticate", return_value=mock_user):
-            with patch(
-                "users.serializers.CustomUser.objects.get", return_value=mock_user
-            ):
-                data = {"email": "nophone@email.com", "password": "pass"}
-                mock_request = MagicMock()
-                serializer = LoginStep1Serializer(
-                    data=data, context={"request": mock_request}
-                )
+        data = {"email": "nophone@email.com", "password": "pass"}
+        serializer = LoginStep1Serializer(data=data, context={"request": _req()})
 
-                self.assertFalse(serializer.is_valid())
-                self.assertIn("non_field_errors", serializer.errors)
-                self.assertEqual(
-                    serializer.errors["non_field_errors"][0].code, "no_phone"
-                )
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("non_field_errors", serializer.errors)
+        self.assertEqual(serializer.errors["non_field_errors"][0].code, "no_phone")
 
 
 class LoginStep2SerializerTests(TestCase):
-    def setUp(self):
-        self.User = get_user_model()
-        self.user = self.User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
             email="some@email.com",
-            password="testpass123",
+            password=PASSWORD_HASH,
             first_name="John",
             last_name="Doe",
             phone_number="+201234567890",
             is_active=True,
             is_email_verified=True,
         )
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
         cache.clear()
 
-    def test_valid_session_and_otp(self):
-        from users.managers import TokenManager
-        from django.core.cache import cache
+    def _start_session(self, session_token):
+        TokenManager.set_login_session(session_token, self.user.id)
+        self.addCleanup(TokenManager.pop_login_session, session_token)
+
+    def _set_otp(self):
+        phone_number = str(self.user.phone_number)
+        self.addCleanup(cache.delete, _OTP_KEY(phone_number))
+        return TokenManager.set_otp_token(self.user.id, phone_number)
 
+    def test_valid_session_and_otp(self):
         session_token = "valid-session-token"
-        cache.set(f"login_session:{session_token}", str(self.user.id), timeout=300)
-        otp = TokenManager.set_otp_token(self.user.id, str(self.user.phone_number))
+        self._start_session(session_token)
+        otp = self._set_otp()
         data = {"session_token": session_token, "otp": otp}
         serializer = LoginStep2Serializer(data=data)
         self.assertTrue(serializer.is_valid())
@@ -328,20 +339,30 @@ class LoginStep2SerializerTests(TestCase):
         self.assertIn("refresh", result)
         self.assertEqual(result["user_data"]["email"], self.user.email)
 
-    def test_invalid_session_token(self):
-        data = {"session_token": "invalid", "otp": 123456}
-        serializer = LoginStep2Serializer(data=data)
-        self.assertFalse(serializer.is_valid())
-        self.assertEqual(serializer.errors["session_token"][0].code, "session_expired")
-        self.assertEqual(
-            str(serializer.errors["session_token"][0]),
-            "Session expired. Please start login again.",
+    def test_create_tokens_revokes_previous_tokens(self):
+        _, old_token = AuthToken.objects.create(user=self.user)
+        # Prime the cached lookup so revocation has to invalidate it too
+        CachedTokenAuthentication().authenticate_credentials(old_token.encode())
+
+        self._start_session("new-session")
+        otp = self._set_otp()
+        serializer = LoginStep2Serializer(
+            data={"session_token": "new-session", "otp": otp}
         )
+        self.assertTrue(serializer.is_valid())
+        result = serializer.create_tokens()
+        # Only the new access/refresh pair is left for knox to scan
+        self.assertEqual(AuthToken.objects.filter(user=self.user).count(), 2)
 
-    def test_invalid_otp(self):
-        from django.core.cache import cache
+        for auth in (TokenAuthentication(), CachedTokenAuthentication()):
+            with self.subTest(auth=type(auth).__name__):
+                with self.assertRaises(exceptions.AuthenticationFailed):
+                    auth.authenticate_credentials(old_token.encode())
+                user, _ = auth.authenticate_credentials(result["access"].encode())
+                self.assertEqual(user, self.user)
 
-        cache.set(f"login_session:valid-token", str(self.user.id), timeout=300)
+    def test_invalid_otp(self):
+        self._start_session("valid-token")
         data = {"session_token": "valid-token", "otp": "WRONG"}
         serializer = LoginStep2Serializer(data=data)
         self.assertFalse(serializer.is_valid())
@@ -349,38 +370,54 @@ class LoginStep2SerializerTests(TestCase):
         self.assertEqual(str(serializer.errors["otp"][0]), "Invalid or expired OTP.")
 
     def test_token_cleanup(self):
-        from django.core.cache import cache
-
         session_token = "test-cleanup"
-        cache.set(f"login_session:{session_token}", str(self.user.id), timeout=300)
+        self._start_session(session_token)
         data = {"session_token": session_token, "otp": "VALID"}
         serializer = LoginStep2Serializer(data=data)
         serializer.is_valid()
-        self.assertIsNone(cache.get(f"login_session:{session_token}"))
+        self.assertIsNone(TokenManager.pop_login_session(session_token))
 
 
-class ResendActivationSerializerTests(TestCase):
-    def setUp(self):
-        self.User = get_user_model()
-        self.unverified_user = self.User.objects.create_user(
-            email="unverified@email.com",
-            password=None,
-            first_name="Unverified",
-            last_name="User",
-            phone_number="+201234567890",
-            is_active=False,
-            is_email_verified=False,
+class LoginStep2SessionTests(SimpleTestCase):
+    """Session checks that fail before any user lookup; DB access is forbidden"""
+
+    def test_invalid_session_token(self):
+        data = {"session_token": "invalid", "otp": 123456}
+        serializer = LoginStep2Serializer(data=data)
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors["session_token"][0].code, "session_expired")
+        self.assertEqual(
+            str(serializer.errors["session_token"][0]),
+            "Session expired. Please start login again.",
         )
-        self.verified_user = self.User.objects.create_user(
-            email="verified@email.com",
-            password="VerifiedPass",
-            first_name="Verified",
-            last_name="User",
-            phone_number="+201234567891",
-            is_active=True,
-            is_email_verified=True,
+
+
+class VerificationUsersMixin:
+    """Creates one verified, active user and one unverified, inactive user"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.verified_user, cls.unverified_user = bulk_create_users(
+            {
+                "email": "verified@email.com",
+                "first_name": "Verified",
+                "last_name": "User",
+                "phone_number": "+201234567890",
+                "is_email_verified": True,
+            },
+            {
+                "email": "unverified@email.com",
+                "password": None,
+                "first_name": "Unverified",
+                "last_name": "User",
+                "phone_number": "+201234567891",
+                "is_active": False,
+                "is_email_verified": False,
+            },
         )
 
+
+class ResendActivationSerializerTests(VerificationUsersMixin, TestCase):
     @patch("users.serializers.TokenManager.set_email_verification_token")
     @patch("users.serializers.send_verification_email")
     def test_resend_to_unverified_user(self, mock_email, mock_token):
@@ -390,45 +427,45 @@ class ResendActivationSerializerTests(TestCase):
         self.assertTrue(serializer.is_valid())
 
         result = serializer.save()
-        self.assertEqual(result["detail"], "Activation email sent.")
+        self.assertIn("activation link has been sent", result["detail"])
         mock_token.assert_called_once()
         mock_email.assert_called_once()
 
-    def test_resend_to_verified_user_fails(self):
+    @patch("users.serializers.TokenManager.set_email_verification_token")
+    @patch("users.serializers.send_verification_email")
+    def test_resend_reuses_validated_user(self, mock_email, mock_token):
+        mock_token.return_value = "new-token"
+        serializer = ResendActivationSerializer(
+            data={"email": self.unverified_user.email}
+        )
+        self.assertTrue(serializer.is_valid())
+
+        with self.assertNumQueries(0):
+            serializer.save()
+        mock_email.assert_called_once_with(self.unverified_user, "new-token")
+
+    @patch("users.serializers.send_verification_email")
+    def test_resend_to_verified_user_silent(self, mock_email):
         data = {"email": self.verified_user.email}
         serializer = ResendActivationSerializer(data=data)
-        self.assertFalse(serializer.is_valid())
-        self.assertIn("email", serializer.errors)
+        self.assertTrue(serializer.is_valid())
+
+        result = serializer.save()
+        self.assertIn("activation link has been sent", result["detail"])
+        mock_email.assert_not_called()
 
-    def test_resend_nonexistent_email(self):
+    @patch("users.serializers.send_verification_email")
+    def test_resend_nonexistent_email_silent(self, mock_email):
         data = {"email": "nonexistent@example.com"}
         serializer = ResendActivationSerializer(data=data)
-        self.assertFalse(serializer.is_valid())
-        self.assertIn("email", serializer.errors)
+        self.assertTrue(serializer.is_valid())
 
+        result = serializer.save()
+        self.assertIn("activation link has been sent", result["detail"])
+        mock_email.assert_not_called()
 
-class ForgotPasswordSerializersTests(TestCase):
-    def setUp(self):
-        self.User = get_user_model()
-        self.verified_user = self.User.objects.create_user(
-            email="verified@email.com",
-            password="testpass123",
-            first_name="Verified",
-            last_name="User",
-            phone_number="+201234567890",
-            is_active=True,
-            is_email_verified=True,
-        )
-        self.unverified_user = self.User.objects.create_user(
-            email="unverified@email.com",
-            password=None,
-            first_name="Unverified",
-            last_name="User",
-            is_active=False,
-            phone_number="+201234567891",
-            is_email_verified=False,
-        )
 
+class ForgotPasswordSerializersTests(VerificationUsersMixin, TestCase):
     @patch("users.managers.TokenManager.set_password_reset_token")
     @patch("users.services.send_forgot_password_email")
     def test_forgot_password_request(self, mock_email, mock_token):
@@ -451,9 +488,8 @@ class ForgotPasswordSerializersTests(TestCase):
         result = serializer.save()
         self.assertIn("password reset link has been sent", result["detail"])
         mock_token.assert_not_called()
-    
+
     def test_forgot_password_reset_valid_token(self):
-        from users.managers import TokenManager
         token = TokenManager.set_password_reset_token(self.verified_user.id)
 
         data = {
@@ -469,7 +505,26 @@ class ForgotPasswordSerializersTests(TestCase):
         self.verified_user.refresh_from_db()
         self.assertTrue(self.verified_user.check_password("newSecurePassword123!"))
         self.assertEqual(result["status"], "password_reset_success")
-    
+
+    def test_forgot_password_reset_invalidates_cached_credentials(self):
+        _, token = AuthToken.objects.create(user=self.verified_user)
+        auth = CachedTokenAuthentication()
+        auth.authenticate_credentials(token.encode())
+
+        serializer = ForgotPasswordResetSerializer(
+            data={
+                "token": TokenManager.set_password_reset_token(self.verified_user.id),
+                "password": "newSecurePassword123!",
+                "password2": "newSecurePassword123!",
+            }
+        )
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+
+        # A stale cache hit would still carry the old password hash
+        user, _ = auth.authenticate_credentials(token.encode())
+        self.assertTrue(user.check_password("newSecurePassword123!"))
+
     def test_forgot_password_reset_password_mismatch(self):
         data = {
             "token": "valid-token",
@@ -484,21 +539,22 @@ class ForgotPasswordSerializersTests(TestCase):
 
 
 class RefreshTokenSerializerTests(TestCase):
-    def setUp(self):
-        self.User = get_user_model()
-        self.user = self.User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
             email="some@email.com",
-            password="testpass123",
+            password=PASSWORD_HASH,
             first_name="John",
             last_name="Doe",
             phone_number="+201234567890",
             is_active=True,
             is_email_verified=True,
         )
-    
+
     def test_refresh_token_valid(self):
-        access_token, _ = AuthToken.objects.create(user=self.user)
-        refresh_instance, refresh_token = AuthToken.objects.create(user=self.user)
+        # A second live token proves refresh also revokes the old access token
+        old_access, _ = AuthToken.objects.create(user=self.user)
+        _, refresh_token = AuthToken.objects.create(user=self.user)
 
         data = {"refresh": refresh_token}
         serializer = RefreshTokenSerializer(data=data)
@@ -508,8 +564,9 @@ class RefreshTokenSerializerTests(TestCase):
 
         self.assertIn("access", result)
         self.assertIn("refresh", result)
-        self.assertEqual(len(AuthToken.objects.filter(user=self.user)), 2)
-    
+        self.assertEqual(AuthToken.objects.filter(user=self.user).count(), 2)
+        self.assertFalse(AuthToken.objects.filter(pk=old_access.pk).exists())
+
     def test_refresh_token_invalid(self):
         data = {"refresh": "invalid-token"}
         serializer = RefreshTokenSerializer(data=data)
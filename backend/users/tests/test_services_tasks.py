@@ -1,9 +1,15 @@
-import uuid
+import smtplib
+import threading
 from unittest.mock import patch
 
+from django.conf import settings
 from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.core import mail
+from django.core.mail.backends import locmem
+from django.utils import timezone
+
+from knox.models import AuthToken
 
 from users.services import (
     send_verification_email,
@@ -15,34 +21,37 @@ from users.tasks import (
     send_forgot_password_email_task,
     send_security_alert_task,
     send_otp_sms_task,
+    purge_revoked_tokens_task,
+    _close_mail_connection,
+    _mail_connection,
 )
+from users.sms_service import _is_twilio_configured
+
+User = get_user_model()
 
 
 class ServicesTests(TestCase):
-    def setUp(self):
-        self.User = get_user_model()
-        self.user = self.User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             email="some@email.com",
-            password="testpass123",
+            password=None,
             first_name="John",
             last_name="Doe",
             phone_number="+201234567890",
         )
-        self.token = "test-token-123"
+        cls.token = "test-token-123"
 
-    @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
     @patch("users.tasks.send_verification_email_task.delay")
     def test_send_verification_email_calls_task(self, mock_task):
         send_verification_email(self.user, self.token)
-        mock_task.assert_called_once_with(self.user.id, self.token)
+        mock_task.assert_called_once_with(self.user.email, self.token)
 
-    @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
     @patch("users.tasks.send_forgot_password_email_task.delay")
     def test_send_forgot_password_email_calls_task(self, mock_task):
         send_forgot_password_email(self.user, self.token)
-        mock_task.assert_called_once_with(self.user.id, self.token)
+        mock_task.assert_called_once_with(self.user.email, self.token)
 
-    @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
     @patch("users.tasks.send_security_alert_task.delay")
     def test_too_many_requests_email_calls_task(self, mock_task):
         msg = "Suspicious login attempt"
@@ -50,102 +59,122 @@ class ServicesTests(TestCase):
         mock_task.assert_called_once_with(self.user.email, msg)
 
 
-class SendVerificationEmailTaskTests(TestCase):
-    def setUp(self):
-        self.User = get_user_model()
-        self.user = self.User.objects.create_user(
-            email="some@email.com",
-            password="testpass123",
-            first_name="John",
-            last_name="Doe",
-            phone_number="+201234567890",
-        )
-        self.token = "test-token-123"
-
-    @override_settings(
-        CELERY_TASK_ALWAYS_EAGER=True,
-        DEFAULT_FROM_EMAIL="[email protected]",
-        EMAIL_HOST="localhost",
-        EMAIL_PORT=1025,
-    )
-    def test_send_verification_email_task_success(self):
-        result = send_verification_email_task(self.user.id, self.token)
-        self.assertIsNone(result)
-        self.assertEqual(len(mail.outbox), 1)
-
-        email = mail.outbox[0]
-        self.assertEqual(email.subject, "Verify your email")
-        self.assertEqual(email.from_email, "[email protected]")
-        self.assertEqual(email.to, [self.user.email])
-
-        expected_link = f"http://localhost:3000/verify-email/?token={self.token}"
-        self.assertIn(expected_link, email.body)
-
-    @override_settings(
-        CELERY_TASK_ALWAYS_EAGER=True,
-        DEFAULT_FROM_EMAIL="[email protected]",
-    )
-    def test_send_verification_email_task_user_not_found(self):
-        result = send_verification_email_task(uuid.uuid4(), self.token)
-        self.assertIsNone(result)
-        self.assertEqual(len(mail.outbox), 0)
-
-    @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
-    def test_send_verification_email_task_invalid_token(self):
-        result = send_verification_email_task(self.user.id, None)
-        self.assertIsNone(result)
-        self.assertEqual(len(mail.outbox), 1)
-        self.assertIn("token=", mail.outbox[0].body)
-
-
-class SendForgotPasswordEmailTaskTests(TestCase):
-    def setUp(self):
-        self.User = get_user_model()
-        self.user = self.User.objects.create_user(
+@override_settings(
+    DEFAULT_FROM_EMAIL="[email protected]",
+    EMAIL_HOST="localhost",
+    EMAIL_PORT=1025,
+)
+class EmailTaskTests(TestCase):
+    # (task, subject, link path): the verification and reset emails differ only here.
+    EMAIL_TASKS = [
+        (send_verification_email_task, "Verify your email", "verify-email"),
+        (send_forgot_password_email_task, "Password Reset", "reset-password"),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             email="some@email.com",
-            password="testpass123",
+            password=None,
             first_name="John",
             last_name="Doe",
             phone_number="+201234567890",
         )
-        self.token = "reset-token-456"
-
-    @override_settings(
-        CELERY_TASK_ALWAYS_EAGER=True,
-        DEFAULT_FROM_EMAIL="[email protected]",
-        EMAIL_HOST="localhost",
-        EMAIL_PORT=1025,
-    )
-    def test_send_forgot_password_email_task_success(self):
-        result = send_forgot_password_email_task(self.user.id, self.token)
-        self.assertIsNone(result)
-        self.assertEqual(len(mail.outbox), 1)
-
-        email = mail.outbox[0]
-        self.assertEqual(email.subject, "Password Reset")
-        self.assertEqual(email.from_email, "[email protected]")
-        self.assertEqual(email.to, [self.user.email])
-
-        expected_link = f"http://localhost:3000/reset-password/?token={self.token}"
-        self.assertIn(expected_link, email.body)
-
-    @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
-    def test_send_forgot_password_email_task_user_not_found(self):
-        result = send_forgot_password_email_task(uuid.uuid4(), self.token)
-        self.assertIsNone(result)
-        self.assertEqual(len(mail.outbox), 0)
-
-    @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
-    def test_send_forgot_password_email_task_invalid_token(self):
-        result = send_forgot_password_email_task(self.user.id, None)
-        self.assertIsNone(result)
+        cls.token = "test-token-123"
+
+    def test_email_task_success(self):
+        for task, subject, path in self.EMAIL_TASKS:
+            with self.subTest(task=task.name):
+                mail.outbox.clear()
+                result = task(self.user.email, self.token)
+                self.assertIsNone(result)
+                self.assertEqual(len(mail.outbox), 1)
+
+                email = mail.outbox[0]
+                self.assertEqual(email.subject, subject)
+                self.assertEqual(email.from_email, "[email protected]")
+                self.assertEqual(email.to, [self.user.email])
+
+                expected_link = f"http://localhost:3000/{path}/?token={self.token}"
+                self.assertIn(expected_link, email.body)
+
+    def test_email_task_does_not_query_user(self):
+        for task, _, _ in self.EMAIL_TASKS:
+            with self.subTest(task=task.name):
+                mail.outbox.clear()
+                with self.assertNumQueries(0):
+                    task(self.user.email, self.token)
+                self.assertEqual(len(mail.outbox), 1)
+
+    def test_email_task_invalid_token(self):
+        for task, _, _ in self.EMAIL_TASKS:
+            with self.subTest(task=task.name):
+                mail.outbox.clear()
+                result = task(self.user.email, None)
+                self.assertIsNone(result)
+                self.assertEqual(len(mail.outbox), 1)
+                self.assertIn("token=", mail.outbox[0].body)
+
+    def test_email_task_retries_transient_smtp_failure(self):
+        for task, _, _ in self.EMAIL_TASKS:
+            with self.subTest(task=task.name):
+                with patch(
+                    "users.tasks.send_mail",
+                    side_effect=[
+                        smtplib.SMTPResponseException(421, "try again"),
+                        None,
+                    ],
+                ) as mock_send:
+                    result = task.apply(args=(self.user.email, self.token), throw=False)
+                self.assertTrue(result.successful())
+                self.assertEqual(mock_send.call_count, 2)
+
+    def test_email_task_does_not_retry_permanent_smtp_failure(self):
+        for task, _, _ in self.EMAIL_TASKS:
+            with self.subTest(task=task.name):
+                with patch(
+                    "users.tasks.send_mail",
+                    side_effect=smtplib.SMTPResponseException(550, "no such user"),
+                ) as mock_send:
+                    with self.assertRaises(smtplib.SMTPResponseException):
+                        task.apply(args=(self.user.email, self.token))
+                mock_send.assert_called_once()
+
+    def test_email_tasks_open_one_connection(self):
+        _close_mail_connection()
+        self.addCleanup(_close_mail_connection)
+        with patch.object(
+            locmem.EmailBackend, "open", autospec=True, return_value=True
+        ) as mock_open:
+            send_verification_email_task(self.user.email, self.token)
+            send_forgot_password_email_task(self.user.email, self.token)
+            send_security_alert_task(self.user.email, "msg")
+        mock_open.assert_called_once()
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_mail_connection_is_per_thread(self):
+        _close_mail_connection()
+        self.addCleanup(_close_mail_connection)
+        other = []
+        thread = threading.Thread(target=lambda: other.append(_mail_connection()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(_mail_connection(), other[0])
+
+    def test_email_task_reconnects_after_server_disconnect(self):
+        _close_mail_connection()
+        self.addCleanup(_close_mail_connection)
+        stale = _mail_connection()
+        with patch.object(
+            stale, "send_messages", side_effect=smtplib.SMTPServerDisconnected
+        ):
+            send_verification_email_task(self.user.email, self.token)
+        self.assertIsNot(_mail_connection(), stale)
         self.assertEqual(len(mail.outbox), 1)
-        self.assertIn("token=", mail.outbox[0].body)
 
 
 class SendSecurityAlertTests(TestCase):
     @override_settings(
-        CELERY_TASK_ALWAYS_EAGER=True,
         DEFAULT_FROM_EMAIL="[email protected]",
         EMAIL_HOST="localhost",
         EMAIL_PORT=1025,
@@ -164,7 +193,6 @@ class SendSecurityAlertTests(TestCase):
         self.assertIn(msg, email.body)
         self.assertIn("security alert", email.body.lower())
 
-    @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
     def test_send_security_alert_task_empty_message(self):
         user_email = "some@email.com"
         result = send_security_alert_task(user_email, "")
@@ -172,7 +200,6 @@ class SendSecurityAlertTests(TestCase):
         self.assertEqual(len(mail.outbox), 1)
         self.assertIn("strange activity", mail.outbox[0].body)
 
-    @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
     def test_send_security_alert_task_long_message(self):
         user_email = "some@email.com"
         long_msg = "Very long suspicious activity description " * 10
@@ -183,8 +210,7 @@ class SendSecurityAlertTests(TestCase):
 
 
 class SendOtpSmsTaskTests(TestCase):
-    @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
-    @patch("users.sms_service.send_otp_sms")
+    @patch("users.tasks.send_otp_sms")
     def test_send_otp_sms_task_calls_sms_service(self, mock_sms):
         phone_number = "+201234567890"
         otp = "ABCD5678"
@@ -192,8 +218,7 @@ class SendOtpSmsTaskTests(TestCase):
         self.assertIsNone(result)
         mock_sms.assert_called_once_with(phone_number, otp)
 
-    @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
-    @patch("users.sms_service.send_otp_sms")
+    @patch("users.tasks.send_otp_sms")
     def test_send_otp_sms_task_handles_sms_failure(self, mock_sms):
         phone_number = "+201234567890"
         otp = "ABCD5678"
@@ -202,8 +227,7 @@ class SendOtpSmsTaskTests(TestCase):
             send_otp_sms_task(phone_number, otp)
         mock_sms.assert_called_once_with(phone_number, otp)
 
-    @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
-    @patch("users.sms_service.send_otp_sms")
+    @patch("users.tasks.send_otp_sms")
     def test_send_otp_task_invalid_phone(self, mock_sms):
         phone_number = ""
         otp = "ABCD5678"
@@ -212,47 +236,83 @@ class SendOtpSmsTaskTests(TestCase):
         mock_sms.assert_called_once_with(phone_number, otp)
 
 
+class TwilioConfigurationTests(TestCase):
+    @override_settings(
+        TWILIO_ACCOUNT_SID="your_sid",
+        TWILIO_AUTH_TOKEN="token",
+        TWILIO_PHONE_NUMBER="+201234567890",
+    )
+    def test_placeholder_credentials_not_configured(self):
+        self.assertFalse(_is_twilio_configured())
+
+    @override_settings(
+        TWILIO_ACCOUNT_SID="AC123",
+        TWILIO_AUTH_TOKEN="token",
+        TWILIO_PHONE_NUMBER="+201234567890",
+    )
+    def test_real_credentials_configured(self):
+        self.assertTrue(_is_twilio_configured())
+
+        with override_settings(TWILIO_AUTH_TOKEN="CHANGEME"):
+            self.assertFalse(_is_twilio_configured())
+
+
+class PurgeRevokedTokensTaskTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="some@email.com",
+            password=None,
+            first_name="John",
+            last_name="Doe",
+            phone_number="+201234567890",
+        )
+
+    def test_purge_deletes_only_revoked_tokens(self):
+        AuthToken.objects.create(user=self.user)
+        self.user.tokens_valid_after = timezone.now()
+        self.user.save(update_fields=["tokens_valid_after"])
+        current, _ = AuthToken.objects.create(user=self.user)
+
+        self.assertEqual(purge_revoked_tokens_task(), 1)
+        self.assertEqual(list(AuthToken.objects.all()), [current])
+
+    def test_purge_is_scheduled_with_beat(self):
+        tasks = [entry["task"] for entry in settings.CELERY_BEAT_SCHEDULE.values()]
+        self.assertIn(purge_revoked_tokens_task.name, tasks)
+
+
+@override_settings(
+    DEFAULT_FROM_EMAIL="[email protected]",
+    EMAIL_HOST="localhost",
+    EMAIL_PORT=1025,
+)
 class CeleryTaskDirectExecutionTests(TestCase):
     """Test Celery tasks by calling them directly (without .delay)"""
 
-    def setUp(self):
-        self.User = get_user_model()
-        self.user = self.User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             email="[email protected]",
-            password="testpass123",
+            password=None,
             first_name="John",
             last_name="Doe",
             phone_number="+201234567890",
         )
-        self.token = "test-token-123"
+        cls.token = "test-token-123"
 
-    @override_settings(
-        DEFAULT_FROM_EMAIL="[email protected]",
-        EMAIL_HOST="localhost",
-        EMAIL_PORT=1025,
-    )
     def test_verification_task_direct_execution(self):
-        result = send_verification_email_task(self.user.id, self.token)
+        result = send_verification_email_task(self.user.email, self.token)
 
         self.assertIsNone(result)
         self.assertEqual(len(mail.outbox), 1)
 
-    @override_settings(
-        DEFAULT_FROM_EMAIL="[email protected]",
-        EMAIL_HOST="localhost",
-        EMAIL_PORT=1025,
-    )
     def test_password_reset_task_direct_execution(self):
-        result = send_forgot_password_email_task(self.user.id, self.token)
+        result = send_forgot_password_email_task(self.user.email, self.token)
 
         self.assertIsNone(result)
         self.assertEqual(len(mail.outbox), 1)
 
-    @override_settings(
-        DEFAULT_FROM_EMAIL="[email protected]",
-        EMAIL_HOST="localhost",
-        EMAIL_PORT=1025,
-    )
     def test_security_alert_direct_execution(self):
         result = send_security_alert_task("[email protected]", "test alert")
 
@@ -262,18 +322,17 @@ class CeleryTaskDirectExecutionTests(TestCase):
 
 # Service Layer Error Handling Tests
 class ServiceErrorHandlingTests(TestCase):
-    def setUp(self):
-        self.User = get_user_model()
-        self.user = self.User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             email="[email protected]",
-            password="testpass123",
+            password=None,
             first_name="John",
             last_name="Doe",
             phone_number="+201234567890",
         )
-        self.token = "error-test-token"
+        cls.token = "error-test-token"
 
-    @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
     @patch("users.tasks.send_verification_email_task.delay")
     def test_send_verification_email_task_failure(self, mock_task):
         # Mock task to raise exception
@@ -283,9 +342,8 @@ class ServiceErrorHandlingTests(TestCase):
         with self.assertRaises(Exception):
             send_verification_email(self.user, self.token)
 
-        mock_task.assert_called_once_with(self.user.id, self.token)
+        mock_task.assert_called_once_with(self.user.email, self.token)
 
-    @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
     @patch("users.tasks.send_forgot_password_email_task.delay")
     def test_send_forgot_password_email_task_failure(self, mock_task):
         mock_task.side_effect = Exception("Task failed")
@@ -293,29 +351,28 @@ class ServiceErrorHandlingTests(TestCase):
         with self.assertRaises(Exception):
             send_forgot_password_email(self.user, self.token)
 
-        mock_task.assert_called_once_with(self.user.id, self.token)
+        mock_task.assert_called_once_with(self.user.email, self.token)
 
 
 # Integration Tests
+@override_settings(
+    DEFAULT_FROM_EMAIL="[email protected]",
+    EMAIL_HOST="localhost",
+    EMAIL_PORT=1025,
+)
 class ServicesTasksIntegrationTests(TestCase):
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         """Set up test fixtures"""
-        self.User = get_user_model()
-        self.user = self.User.objects.create_user(
+        cls.user = User.objects.create_user(
             email="[email protected]",
-            password="testpass123",
+            password=None,
             first_name="John",
             last_name="Doe",
             phone_number="+201234567890",
         )
-        self.token = "integration-test-token"
+        cls.token = "integration-test-token"
 
-    @override_settings(
-        CELERY_TASK_ALWAYS_EAGER=True,
-        DEFAULT_FROM_EMAIL="[email protected]",
-        EMAIL_HOST="localhost",
-        EMAIL_PORT=1025,
-    )
     def test_complete_verification_flow(self):
         # Service calls task
         send_verification_email(self.user, self.token)
@@ -326,12 +383,6 @@ class ServicesTasksIntegrationTests(TestCase):
         self.assertIn(self.token, email.body)
         self.assertIn("verify-email", email.body)
 
-    @override_settings(
-        CELERY_TASK_ALWAYS_EAGER=True,
-        DEFAULT_FROM_EMAIL="[email protected]",
-        EMAIL_HOST="localhost",
-        EMAIL_PORT=1025,
-    )
     def test_complete_password_reset_flow(self):
         send_forgot_password_email(self.user, self.token)
 
@@ -340,12 +391,6 @@ class ServicesTasksIntegrationTests(TestCase):
         self.assertIn(self.token, email.body)
         self.assertIn("reset-password", email.body)
 
-    @override_settings(
-        CELERY_TASK_ALWAYS_EAGER=True,
-        DEFAULT_FROM_EMAIL="[email protected]",
-        EMAIL_HOST="localhost",
-        EMAIL_PORT=1025,
-    )
     def test_security_alert_flow(self):
         too_many_requests_email(self.user.email, "Login attempts")
 
@@ -1,12 +1,17 @@
-from unittest.mock import patch, MagicMock
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+from django.conf import settings
 from django.urls import reverse
-from django.test import TestCase
+from django.test import SimpleTestCase
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from knox.models import AuthToken
 
+from users.authentication import CachedTokenAuthentication
+from users.throttles import AuthRateThrottle
 from users.views import (
     CreateUserView,
     ActivateAccountView,
@@ -18,9 +23,20 @@ from users.views import (
     ForgotPasswordResetView,
     LogoutView,
 )
+from users.tests.utils import bulk_create_users
 
+User = get_user_model()
 
-class UsersURLTests(TestCase):
+
+def _serializer_stub(**results):
+    """Patched-serializer stand-in: always valid, each method returns its result"""
+    return SimpleNamespace(
+        is_valid=lambda raise_exception=False: True,
+        **{name: (lambda result=result: result) for name, result in results.items()},
+    )
+
+
+class UsersURLTests(SimpleTestCase):
     def test_url_names_reverse(self):
         url_names = [
             "users:create-user",
@@ -42,37 +58,31 @@ class UsersURLTests(TestCase):
 
 
 class CreateUserViewTests(APITestCase):
-    def setUp(self):
-        self.User = get_user_model()
-        self.admin_user = self.User.objects.create_user(
-            email="admin@test.com",
-            password="adminpass123",
-            first_name="Admin",
-            last_name="User",
-            phone_number="+201234567890",
-            type="admin",
-            is_active=True,
-        )
-        self.admin_token = AuthToken.objects.create(user=self.admin_user)[1]
-        self.manager_user = self.User.objects.create_user(
-            email="manager@test.com",
-            password="managerpass123",
-            first_name="Manager",
-            last_name="User",
-            phone_number="+201234567891",
-            type="manager",
-            is_active=True,
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("users:create-user")
+        cls.admin_user, cls.manager_user = bulk_create_users(
+            {
+                "email": "admin@test.com",
+                "first_name": "Admin",
+                "last_name": "User",
+                "phone_number": "+201234567890",
+                "type": "admin",
+            },
+            {
+                "email": "manager@test.com",
+                "first_name": "Manager",
+                "last_name": "User",
+                "phone_number": "+201234567891",
+                "type": "manager",
+            },
         )
-        self.manager_token = AuthToken.objects.create(user=self.manager_user)[1]
-        cache.clear()
 
-    def get_authenticated_client(self, token):
-        client = APIClient()
-        client.credentials(HTTP_AUTHORIZATION="Token " + token)
-        return client
+    def setUp(self):
+        cache.clear()
 
     def test_admin_can_create_manager(self):
-        client = self.get_authenticated_client(self.admin_token)
+        self.client.force_authenticate(user=self.admin_user)
 
         data = {
             "email": "newmanager@test.com",
@@ -83,20 +93,19 @@ class CreateUserViewTests(APITestCase):
         }
 
         with patch("users.views.CreateUserSerializer") as mock_serializer_class:
-            mock_serializer = MagicMock()
-            mock_serializer.is_valid.return_value = True
-            mock_serializer.save.return_value = MagicMock(
-                id="uuid", email="newmanager@test.com", type="manager"
+            mock_serializer_class.return_value = _serializer_stub(
+                save=SimpleNamespace(
+                    id="uuid", email="newmanager@test.com", type="manager"
+                )
             )
-            mock_serializer_class.return_value = mock_serializer
 
-            response = client.post(reverse("users:create-user"), data)
+            response = self.client.post(self.url, data, format="json")
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertIn("User created successfully", response.data["message"])
 
     def test_admin_cannot_create_admin(self):
-        client = self.get_authenticated_client(self.admin_token)
+        self.client.force_authenticate(user=self.admin_user)
         data = {
             "email": "fakeadmin@test.com",
             "first_name": "Fake",
@@ -104,11 +113,11 @@ class CreateUserViewTests(APITestCase):
             "phone_number": "+201234567892",
             "type": "admin",
         }
-        response = client.post(reverse("users:create-user"), data)
+        response = self.client.post(self.url, data, format="json")
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
     def test_manager_can_create_staff(self):
-        client = self.get_authenticated_client(self.manager_token)
+        self.client.force_authenticate(user=self.manager_user)
         data = {
             "email": "newstaff@test.com",
             "first_name": "New",
@@ -116,20 +125,19 @@ class CreateUserViewTests(APITestCase):
             "phone_number": "+201234567893",
             "type": "staff",
         }
-        response = client.post(reverse("users:create-user"), data)
+        response = self.client.post(self.url, data, format="json")
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
     def test_unauthenticated_cannot_create(self):
-        client = APIClient()
         data = {"email": "test@test.com", "first_name": "Test", "last_name": "User"}
-        response = client.post(reverse("users:create-user"), data)
+        response = self.client.post(self.url, data, format="json")
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
 class ActivateAccountViewTests(APITestCase):
-    def setUp(self):
-        self.User = get_user_model()
-        self.user = self.User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             email="pending@test.com",
             password=None,
             first_name="Pending",
@@ -138,33 +146,32 @@ class ActivateAccountViewTests(APITestCase):
             is_active=False,
             is_email_verified=False,
         )
+
+    def setUp(self):
         cache.clear()
 
     @patch("users.views.ActivateAccountSerializer")
     def test_valid_activation(self, mock_serializer):
-        mock_serializer_instance = MagicMock()
-        mock_serializer_instance.is_valid.return_value = True
-        mock_serializer_instance.save.return_value = {
-            "status": "activated",
-            "email": "pending@test.com",
-        }
-        mock_serializer.return_value = mock_serializer_instance
+        mock_serializer.return_value = _serializer_stub(
+            save={"status": "activated", "email": "pending@test.com"}
+        )
 
-        response = self.client.post(reverse("users:activate"), {})
+        response = self.client.post(reverse("users:activate"), {}, format="json")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
     def test_invalid_token(self):
         response = self.client.post(
             reverse("users:activate"),
             {"token": "invalid-token", "password": "test123", "password2": "test123"},
+            format="json",
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
 class LoginFlowTests(APITestCase):
-    def setUp(self):
-        self.User = get_user_model()
-        self.user = self.User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             email="user@test.com",
             password="testpass123",
             first_name="John",
@@ -173,33 +180,31 @@ class LoginFlowTests(APITestCase):
             is_active=True,
             is_email_verified=True,
         )
+
+    def setUp(self):
         cache.clear()
 
     @patch("users.views.LoginStep1Serializer")
     @patch("users.views.LoginStep2Serializer")
     def test_complete_login_flow(self, mock_step2, mock_step1):
         # Mock step 1
-        mock_step1_instance = MagicMock()
-        mock_step1_instance.is_valid.return_value = True
-        mock_step1_instance.create_session_and_send_otp.return_value = {
-            "message": "OTP sent",
-            "session_token": "test-session",
-        }
-        mock_step1.return_value = mock_step1_instance
+        mock_step1.return_value = _serializer_stub(
+            create_session_and_send_otp={
+                "message": "OTP sent",
+                "session_token": "test-session",
+            }
+        )
 
         # Mock step 2
-        mock_step2_instance = MagicMock()
-        mock_step2_instance.is_valid.return_value = True
-        mock_step2_instance.create_tokens.return_value = {
-            "access": "access_token",
-            "refresh": "refresh_token",
-        }
-        mock_step2.return_value = mock_step2_instance
+        mock_step2.return_value = _serializer_stub(
+            create_tokens={"access": "access_token", "refresh": "refresh_token"}
+        )
 
         # Step 1
         step1_response = self.client.post(
             reverse("users:login"),
             {"email": "user@test.com", "password": "testpass123"},
+            format="json",
         )
         self.assertEqual(step1_response.status_code, status.HTTP_200_OK)
 
@@ -207,33 +212,38 @@ class LoginFlowTests(APITestCase):
         step2_response = self.client.post(
             reverse("users:login-verify"),
             {"session_token": "test-session", "otp": "123456"},
+            format="json",
         )
         self.assertEqual(step2_response.status_code, status.HTTP_200_OK)
 
     def test_login_step1_invalid_credentials(self):
         response = self.client.post(
-            reverse("users:login"), {"email": "wrong@test.com", "password": "wrongpass"}
+            reverse("users:login"),
+            {"email": "wrong@test.com", "password": "wrongpass"},
+            format="json",
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
 class TokenManagementTests(APITestCase):
-    def setUp(self):
-        self.User = get_user_model()
-        self.user = self.User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             email="tokenuser@test.com",
-            password="testpass123",
+            password=None,
             first_name="Token",
             last_name="User",
             phone_number="+201234567890",
             is_active=True,
         )
-        self.token = AuthToken.objects.create(user=self.user)[1]
+        cls.token = AuthToken.objects.create(user=cls.user)[1]
+
+    def setUp(self):
         cache.clear()
 
     def test_token_refresh(self):
         response = self.client.post(
-            reverse("users:token-refresh"), {"refresh": self.token}
+            reverse("users:token-refresh"), {"refresh": self.token}, format="json"
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn("access", response.data)
@@ -241,7 +251,7 @@ class TokenManagementTests(APITestCase):
 
     def test_token_refresh_invalid(self):
         response = self.client.post(
-            reverse("users:token-refresh"), {"refresh": "invalid-token"}
+            reverse("users:token-refresh"), {"refresh": "invalid-token"}, format="json"
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
@@ -252,40 +262,60 @@ class TokenManagementTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, {"detail": "Successfully logged out."})
 
+    def test_cached_token_lookup_skips_database(self):
+        auth = CachedTokenAuthentication()
+        auth.authenticate_credentials(self.token.encode())
+        with self.assertNumQueries(0):
+            user, _ = auth.authenticate_credentials(self.token.encode())
+        self.assertEqual(user, self.user)
+
+    def test_logout_drops_cached_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+        self.assertEqual(
+            self.client.post(reverse("users:logout")).status_code, status.HTTP_200_OK
+        )
+        response = self.client.post(reverse("users:logout"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_save_drops_cached_token(self):
+        auth = CachedTokenAuthentication()
+        auth.authenticate_credentials(self.token.encode())
+        self.user.is_active = False
+        self.user.save(update_fields=["is_active"])
+        with self.assertRaises(AuthenticationFailed):
+            auth.authenticate_credentials(self.token.encode())
+
 
 class ForgotPasswordTests(APITestCase):
-    def setUp(self):
-        self.User = get_user_model()
-        self.user = self.User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             email="reset@test.com",
-            password="oldpass123",
+            password=None,
             first_name="Reset",
             last_name="User",
             phone_number="+201234567890",
             is_active=True,
             is_email_verified=True,
         )
+
+    def setUp(self):
         cache.clear()
 
     @patch("users.views.ForgotPasswordRequestSerializer")
     def test_forgot_password_request(self, mock_serializer):
-        mock_serializer_instance = MagicMock()
-        mock_serializer_instance.is_valid.return_value = True
-        mock_serializer.return_value = mock_serializer_instance
+        mock_serializer.return_value = _serializer_stub(save=None)
 
         response = self.client.post(
-            reverse("users:forgot-password"), {"email": "reset@test.com"}
+            reverse("users:forgot-password"), {"email": "reset@test.com"}, format="json"
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
     @patch("users.views.ForgotPasswordResetSerializer")
     def test_password_reset(self, mock_serializer):
-        mock_serializer_instance = MagicMock()
-        mock_serializer_instance.is_valid.return_value = True
-        mock_serializer_instance.save.return_value = {
-            "status": "password_reset_success"
-        }
-        mock_serializer.return_value = mock_serializer_instance
+        mock_serializer.return_value = _serializer_stub(
+            save={"status": "password_reset_success"}
+        )
 
         response = self.client.post(
             reverse("users:reset-password"),
@@ -294,39 +324,50 @@ class ForgotPasswordTests(APITestCase):
                 "password": "newpass123",
                 "password2": "newpass123",
             },
+            format="json",
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
 
 class PermissionTests(APITestCase):
-    def setUp(self):
-        self.User = get_user_model()
-        self.admin_user = self.User.objects.create_user(
-            email="admin@test.com",
-            password="adminpass",
-            first_name="Admin",
-            last_name="Test",
-            type="admin",
-            is_active=True,
-            phone_number="+201234567891"
-        )
-        self.staff_user = self.User.objects.create_user(
-            email="staff@test.com",
-            password="staffpass",
-            first_name="Staff",
-            last_name="Test",
-            type="staff",
-            is_active=True,
-            phone_number="+201234567890"
+    PUBLIC_URL_NAMES = [
+        "users:activate",
+        "users:resend-activation",
+        "users:login",
+        "users:login-verify",
+        "users:forgot-password",
+        "users:reset-password",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.public_urls = [reverse(name) for name in cls.PUBLIC_URL_NAMES]
+        cls.admin_user, cls.staff_user = bulk_create_users(
+            {
+                "email": "admin@test.com",
+                "first_name": "Admin",
+                "last_name": "Test",
+                "type": "admin",
+                "phone_number": "+201234567891",
+            },
+            {
+                "email": "staff@test.com",
+                "first_name": "Staff",
+                "last_name": "Test",
+                "type": "staff",
+                "phone_number": "+201234567890",
+            },
         )
-        self.admin_token = AuthToken.objects.create(user=self.admin_user)[1]
-        self.staff_token = AuthToken.objects.create(user=self.staff_user)[1]
+
+    def setUp(self):
+        # These tests hit the throttled auth endpoints; start each one with
+        # fresh throttle counters
+        cache.clear()
 
     def test_create_user_permissions(self):
-        client = APIClient()
-        client.credentials(HTTP_AUTHORIZATION="Token " + self.staff_token)
+        self.client.force_authenticate(user=self.staff_user)
 
-        response = client.post(reverse("users:create-user"), {})
+        response = self.client.post(reverse("users:create-user"), {}, format="json")
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
     def test_logout_requires_auth(self):
@@ -334,16 +375,94 @@ class PermissionTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
     def test_public_endpoints_allow_any(self):
-        public_endpoints = [
-            reverse("users:activate"),
-            reverse("users:resend-activation"),
-            reverse("users:login"),
-            reverse("users:login-verify"),
-            reverse("users:forgot-password"),
-            reverse("users:reset-password"),
-        ]
-
-        for url in public_endpoints:
+        for url in self.public_urls:
             with self.subTest(url=url):
-                response = self.client.post(url, {})
+                response = self.client.post(url, {}, format="json")
                 self.assertNotEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AuthThrottleTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    @patch("users.views.LoginStep1Serializer")
+    def test_login_step1_throttled_per_email_across_ips(self, mock_serializer):
+        mock_serializer.return_value = _serializer_stub(
+            create_session_and_send_otp={"session_token": "s"}
+        )
+        data = {"email": "User@Test.com", "password": "x"}
+        for i in range(3):
+            response = self.client.post(
+                reverse("users:login"), data, format="json", REMOTE_ADDR=f"10.0.0.{i}"
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        data["email"] = "user@test.com"
+        response = self.client.post(
+            reverse("users:login"), data, format="json", REMOTE_ADDR="10.0.0.9"
+        )
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @patch("users.views.LoginStep1Serializer")
+    def test_login_step1_failed_attempts_leave_sms_budget(self, mock_serializer):
+        rejected = SimpleNamespace(
+            is_valid=Mock(side_effect=ValidationError("bad credentials"))
+        )
+        accepted = _serializer_stub(create_session_and_send_otp={"session_token": "s"})
+        mock_serializer.side_effect = [rejected] * 3 + [accepted]
+        data = {"email": "user@test.com", "password": "x"}
+        statuses = [
+            self.client.post(reverse("users:login"), data, format="json").status_code
+            for _ in range(4)
+        ]
+        self.assertEqual(statuses, [400, 400, 400, 200])
+
+    def test_login_step1_failed_attempts_throttled_per_email(self):
+        data = {"email": "nobody@test.com", "password": "x"}
+        for i in range(10):
+            response = self.client.post(
+                reverse("users:login"), data, format="json", REMOTE_ADDR=f"10.0.0.{i}"
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(
+            reverse("users:login"), data, format="json", REMOTE_ADDR="10.0.0.99"
+        )
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @patch("users.views.ForgotPasswordRequestSerializer")
+    def test_auth_endpoints_throttled_per_ip(self, mock_serializer):
+        mock_serializer.return_value = _serializer_stub(save=None)
+        url = reverse("users:forgot-password")
+        for i in range(20):
+            response = self.client.post(url, {"email": f"{i}@test.com"}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.post(url, {"email": "last@test.com"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @patch("users.views.ForgotPasswordRequestSerializer")
+    def test_spoofed_forwarded_for_does_not_reset_ip_limit(self, mock_serializer):
+        mock_serializer.return_value = _serializer_stub(save=None)
+        url = reverse("users:forgot-password")
+        # Direct access trusts no proxy; behind nginx only its appended entry
+        for num_proxies in (0, 1):
+            rest_framework = {**settings.REST_FRAMEWORK, "NUM_PROXIES": num_proxies}
+            with self.subTest(num_proxies=num_proxies), self.settings(
+                REST_FRAMEWORK=rest_framework
+            ):
+                cache.clear()
+                for i in range(21):
+                    response = self.client.post(
+                        url,
+                        {"email": f"{i}@test.com"},
+                        format="json",
+                        HTTP_X_FORWARDED_FOR=f"203.0.113.{i}, 10.0.0.1",
+                    )
+                self.assertEqual(
+                    response.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+                )
+
+    def test_rate_accepts_period_multiplier(self):
+        self.assertEqual(AuthRateThrottle().parse_rate("3/5m"), (3, 300))
+        self.assertEqual(AuthRateThrottle().parse_rate("20/min"), (20, 60))
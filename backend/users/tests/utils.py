@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+
+# Fixture users skip create_user and share one precomputed hash
+PASSWORD_HASH = make_password("testpass123")
+
+
+def bulk_create_users(*users):
+    """
+    Insert active fixture users in one query with the shared password hash.
+    Fields override those defaults; a None password is left unusable.
+    """
+    User = get_user_model()
+    instances = []
+    for fields in users:
+        user = User(**{"password": PASSWORD_HASH, "is_active": True, **fields})
+        if user.password is None:
+            user.set_unusable_password()
+        instances.append(user)
+    return User.objects.bulk_create(instances)
+
+
+DEFAULT_USER = {
+    "email": "some@email.com",
+    "password": "testpass123",
+    "first_name": "John",
+    "last_name": "Doe",
+    "phone_number": "+201234567890",
+}
+
+
+def make_user(**overrides):
+    """Create a user through the manager, overriding DEFAULT_USER fields"""
+    return get_user_model().objects.create_user(**{**DEFAULT_USER, **overrides})
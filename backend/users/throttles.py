@@ -0,0 +1,81 @@
+"""
+File: throttles.py
+Author: Hamdy El-Madbouly
+Description: Rate limits for the unauthenticated authentication endpoints.
+Caps login, OTP and password-reset attempts per client IP and per submitted
+identifier so credential stuffing and SMS pumping can't burn password-hash CPU
+or paid SMS sends. Counters live in the default cache, so every worker shares
+them; throttled requests get DRF's standard HTTP 429 response.
+"""
+
+import re
+
+from rest_framework.throttling import SimpleRateThrottle
+
+_PERIOD = re.compile(r"(\d*)([smhd])\w*")
+_PERIOD_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+class AuthRateThrottle(SimpleRateThrottle):
+    """
+    Per-client-IP limit shared by the auth endpoints.
+    Applies to authenticated callers too, so a token can't lift the limit.
+    """
+
+    scope = "auth_ip"
+
+    def parse_rate(self, rate):
+        """Like DRF's parser, but also accepts a period multiplier ("3/5m")."""
+        if rate is None:
+            return (None, None)
+        num, period = rate.split("/")
+        multiplier, unit = _PERIOD.fullmatch(period).groups()
+        return (int(num), int(multiplier or 1) * _PERIOD_SECONDS[unit])
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": self.get_ident(request),
+        }
+
+
+class FieldRateThrottle(AuthRateThrottle):
+    """
+    Limits by a submitted field, so one account or session can't be targeted
+    from many IPs. Requests without the field are left to the serializer.
+    """
+
+    field = None
+
+    def get_cache_key(self, request, view):
+        data = request.data if hasattr(request.data, "get") else {}
+        value = data.get(self.field)
+        if not value:
+            return None
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": str(value).strip().lower(),
+        }
+
+
+class LoginEmailThrottle(FieldRateThrottle):
+    # Every step 1 attempt; loose so a stranger can't lock an account out
+    scope = "login_email"
+    field = "email"
+
+
+class LoginSmsThrottle(FieldRateThrottle):
+    # Checked by the view only once the credentials are valid, since each
+    # of those sends a paid SMS
+    scope = "login_sms"
+    field = "email"
+
+
+class OtpSessionThrottle(FieldRateThrottle):
+    scope = "otp_session"
+    field = "session_token"
+
+
+class PasswordResetEmailThrottle(FieldRateThrottle):
+    scope = "password_reset_email"
+    field = "email"
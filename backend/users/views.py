@@ -11,7 +11,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 
-from knox.auth import TokenAuthentication
+from .authentication import CachedTokenAuthentication, revoke_cached_credentials
 from drf_spectacular.utils import extend_schema
 from drf_spectacular.types import OpenApiTypes
 
@@ -26,6 +26,13 @@ from .serializers import (
     ForgotPasswordResetSerializer,
 )
 from .permissions import IsAdminOrManager, CanCreateUserType
+from .throttles import (
+    AuthRateThrottle,
+    LoginEmailThrottle,
+    LoginSmsThrottle,
+    OtpSessionThrottle,
+    PasswordResetEmailThrottle,
+)
 
 
 class CreateUserView(APIView):
@@ -35,7 +42,7 @@ class CreateUserView(APIView):
     - Manager can create: Staff only
     """
 
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated, IsAdminOrManager, CanCreateUserType]
 
     @extend_schema(
@@ -123,6 +130,7 @@ class LoginStep1View(APIView):
     """
 
     permission_classes = [AllowAny]
+    throttle_classes = [AuthRateThrottle, LoginEmailThrottle]
 
     @extend_schema(
         summary="Login Step 1 - Send OTP",
@@ -132,6 +140,7 @@ class LoginStep1View(APIView):
         responses={
             200: OpenApiTypes.OBJECT,
             400: OpenApiTypes.OBJECT,
+            429: OpenApiTypes.OBJECT,
         },
     )
     def post(self, request):
@@ -139,6 +148,9 @@ class LoginStep1View(APIView):
             data=request.data, context={"request": request}
         )
         serializer.is_valid(raise_exception=True)
+        sms_throttle = LoginSmsThrottle()
+        if not sms_throttle.allow_request(request, self):
+            self.throttled(request, sms_throttle.wait())
         result = serializer.create_session_and_send_otp()
         return Response(result, status=status.HTTP_200_OK)
 
@@ -149,6 +161,7 @@ class LoginStep2View(APIView):
     """
 
     permission_classes = [AllowAny]
+    throttle_classes = [AuthRateThrottle, OtpSessionThrottle]
 
     @extend_schema(
         summary="Login Step 2 - Verify OTP",
@@ -158,6 +171,7 @@ class LoginStep2View(APIView):
         responses={
             200: OpenApiTypes.OBJECT,
             400: OpenApiTypes.OBJECT,
+            429: OpenApiTypes.OBJECT,
         },
     )
     def post(self, request):
@@ -197,6 +211,7 @@ class ForgotPasswordRequestView(APIView):
     """
 
     permission_classes = [AllowAny]
+    throttle_classes = [AuthRateThrottle, PasswordResetEmailThrottle]
 
     @extend_schema(
         summary="Request Password Reset",
@@ -206,6 +221,7 @@ class ForgotPasswordRequestView(APIView):
         responses={
             200: OpenApiTypes.OBJECT,
             400: OpenApiTypes.OBJECT,
+            429: OpenApiTypes.OBJECT,
         },
     )
     def post(self, request):
@@ -249,7 +265,7 @@ class LogoutView(APIView):
     Logout user by deleting their tokens.
     """
 
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     @extend_schema(
@@ -266,6 +282,7 @@ class LogoutView(APIView):
     def post(self, request):
         # Delete all tokens for this user
         request._auth.delete()
+        revoke_cached_credentials(request.user.pk)
         return Response(
             {"detail": "Successfully logged out."}, status=status.HTTP_200_OK
         )